@@ -40,6 +40,9 @@ class Config:
     # =========================
     SCRFD_MODEL_PATH: str = field(default_factory=lambda: os.getenv("SCRFD_MODEL_PATH", "../backend-fastapi/models/buffalo_l/det_10g.onnx"))
     ARCFACE_MODEL_PATH: str = field(default_factory=lambda: os.getenv("ARCFACE_MODEL_PATH", "../backend-fastapi/models/buffalo_l/w600k_r50.onnx"))
+    # Use <model>.int8.onnx on CPU / <model>.fp16.onnx on CUDA (built by quantize_arcface.py) when present
+    ARCFACE_PREFER_INT8: bool = field(default_factory=lambda: os.getenv("ARCFACE_PREFER_INT8", "true").lower() == "true")
+    ARCFACE_PREFER_FP16: bool = field(default_factory=lambda: os.getenv("ARCFACE_PREFER_FP16", "true").lower() == "true")
     
     # =========================
     # Recognition
@@ -49,6 +52,15 @@ class Config:
     MAX_RECOGNITION_ATTEMPTS: int = field(default_factory=lambda: int(os.getenv("MAX_RECOGNITION_ATTEMPTS", "3")))
     TRACK_COOLDOWN_SECONDS: int = field(default_factory=lambda: int(os.getenv("TRACK_COOLDOWN_SECONDS", "30")))
     
+    # =========================
+    # Face Index (HNSW)
+    # =========================
+    HNSW_M: int = field(default_factory=lambda: int(os.getenv("HNSW_M", "24")))
+    HNSW_EF_CONSTRUCTION: int = field(default_factory=lambda: int(os.getenv("HNSW_EF_CONSTRUCTION", "200")))
+    HNSW_EF_SEARCH: int = field(default_factory=lambda: int(os.getenv("HNSW_EF_SEARCH", "64")))
+    HNSW_ADAPTIVE_EF: bool = field(default_factory=lambda: os.getenv("HNSW_ADAPTIVE_EF", "false").lower() == "true")
+    HNSW_TARGET_LATENCY_MS: float = field(default_factory=lambda: float(os.getenv("HNSW_TARGET_LATENCY_MS", "2.0")))
+    
     # =========================
     # GPIO (Gate Control)
     # =========================
@@ -65,6 +77,8 @@ class Config:
     DISPLAY_WIDTH: int = field(default_factory=lambda: int(os.getenv("DISPLAY_WIDTH", "1280")))
     DISPLAY_HEIGHT: int = field(default_factory=lambda: int(os.getenv("DISPLAY_HEIGHT", "720")))
     DISPLAY_FULLSCREEN: bool = field(default_factory=lambda: os.getenv("DISPLAY_FULLSCREEN", "false").lower() == "true")
+    # GPU-composited OpenGL window (needs OpenCV built with OpenGL; falls back otherwise)
+    DISPLAY_OPENGL: bool = field(default_factory=lambda: os.getenv("DISPLAY_OPENGL", "false").lower() == "true")
     # "continuous" = live video (demo), "alert_only" = only UNKNOWN/WANTED (production), "streaming" = raw video
     DISPLAY_MODE: str = field(default_factory=lambda: os.getenv("DISPLAY_MODE", "continuous"))
     ALERT_DISPLAY_DURATION: float = field(default_factory=lambda: float(os.getenv("ALERT_DISPLAY_DURATION", "60.0")))
@@ -92,6 +106,9 @@ class Config:
     # LiveKit
     # =========================
     LIVEKIT_URL: Optional[str] = field(default_factory=lambda: os.getenv("LIVEKIT_URL"))
+    # "I420" (encoder-native YUV, 1.5 B/px) or "RGB24";
+    # unsupported formats fall back in that order
+    STREAM_PIXEL_FORMAT: str = field(default_factory=lambda: os.getenv("STREAM_PIXEL_FORMAT", "I420"))
     
     # =========================
     # Storage
@@ -60,6 +60,7 @@ from vision import (
     Track, 
     align_face, 
     align_face_from_bbox,
+    batch_align_faces,
     filter_quality_detections,
     MIN_FACE_WIDTH,
 )
@@ -174,6 +175,11 @@ class GateNode:
                 index_path=config.INDEX_PATH,
                 metadata_path=config.METADATA_PATH,
                 dimension=512,  # ArcFace dimension
+                m=config.HNSW_M,
+                ef_construction=config.HNSW_EF_CONSTRUCTION,
+                ef_search=config.HNSW_EF_SEARCH,
+                adaptive_ef=config.HNSW_ADAPTIVE_EF,
+                target_latency_ms=config.HNSW_TARGET_LATENCY_MS,
             )
             
             # Access logger (SQLite)
@@ -213,6 +219,8 @@ class GateNode:
             # Initialize recognizer
             self.recognizer = ArcFaceRecognizer(
                 model_path=str(arcface_path),
+                prefer_int8=config.ARCFACE_PREFER_INT8,
+                prefer_fp16=config.ARCFACE_PREFER_FP16,
             )
             
             # Initialize DeepSORT-lite tracker
@@ -360,6 +368,7 @@ class GateNode:
                     fullscreen=getattr(config, 'DISPLAY_FULLSCREEN', False),
                     capture_thread=self.capture_thread,  # For streaming mode
                     alarm_enabled=config.ALARM_ENABLED,
+                    opengl=config.DISPLAY_OPENGL,
                 )
             
             # Stream thread (optional)
@@ -371,6 +380,7 @@ class GateNode:
                     frame_height=config.CAMERA_HEIGHT,
                     fps=config.CAMERA_FPS,
                     capture_thread=self.capture_thread,  # For smooth streaming
+                    pixel_format=config.STREAM_PIXEL_FORMAT,
                 )
                 logger.info("StreamThread connected to CaptureThread for smooth streaming")
             else:
@@ -754,6 +764,9 @@ class GateNode:
             if frame is None:
                 # No frame available, capture thread might be starting up
                 continue
+            # Handed to the UI and stream threads by reference (no per-consumer
+            # copy); read-only so any consumer that tries to draw on it fails loudly
+            frame.setflags(write=False)
             
             self.stats["frames_processed"] += 1
             
@@ -785,33 +798,50 @@ class GateNode:
             # =========================
             # Only compute embeddings for detections that might match recognized tracks
             # This enables person-swap detection without computing all embeddings
-            tracker_detections = []
-            for det in quality_detections:
-                embedding = None
-                
+            recognized_tracks = [t for t in self.tracker.get_all_active_tracks() if t.recognized]
+            swap_check = []  # Indices of detections near a recognized track
+            for i, det in enumerate(quality_detections):
                 # Check if this detection might match a recognized track
                 # (compute embedding for swap detection)
                 det_cx = (det.bbox[0] + det.bbox[2]) / 2
                 det_cy = (det.bbox[1] + det.bbox[3]) / 2
                 
-                for track in self.tracker.get_all_active_tracks():
-                    if track.recognized:
-                        trk_cx = (track.bbox[0] + track.bbox[2]) / 2
-                        trk_cy = (track.bbox[1] + track.bbox[3]) / 2
-                        
-                        # If detection is near a recognized track, compute embedding
-                        if abs(det_cx - trk_cx) < 100 and abs(det_cy - trk_cy) < 100:
-                            # Compute embedding for swap detection
-                            if det.landmarks is not None:
-                                aligned = align_face(frame, det.landmarks)
-                                if aligned is not None:
-                                    embedding = self.recognizer.get_embedding(aligned)
-                            break
-                
-                tracker_detections.append((det.bbox, det.score, embedding, det.landmarks))
+                for track in recognized_tracks:
+                    trk_cx = (track.bbox[0] + track.bbox[2]) / 2
+                    trk_cy = (track.bbox[1] + track.bbox[3]) / 2
+                    
+                    # If detection is near a recognized track, compute embedding
+                    if abs(det_cx - trk_cx) < 100 and abs(det_cy - trk_cy) < 100:
+                        if det.landmarks is not None:
+                            swap_check.append(i)
+                        break
+            
+            # Align all swap-check faces together and embed them in one batch
+            n_quality = len(quality_detections)
+            embeddings = None
+            emb_valid = np.zeros(n_quality, dtype=bool)
+            if swap_check:
+                aligned_faces = batch_align_faces(
+                    frame, [quality_detections[i].landmarks for i in swap_check],
+                    use_cuda=self.recognizer.uses_cuda,
+                )
+                batch_embeddings = self.recognizer.get_embeddings_batch(aligned_faces)
+                for i, embedding in zip(swap_check, batch_embeddings):
+                    if embedding is None:
+                        continue
+                    if embeddings is None:
+                        embeddings = np.zeros((n_quality, len(embedding)), dtype=np.float32)
+                    embeddings[i] = embedding
+                    emb_valid[i] = True
             
             # Update tracker with quality detections (now with embeddings for swap detection)
-            confirmed_tracks = self.tracker.update(tracker_detections)
+            confirmed_tracks = self.tracker.update_batched(
+                np.array([det.bbox for det in quality_detections], dtype=np.float32).reshape(n_quality, 4),
+                np.array([det.score for det in quality_detections], dtype=np.float32),
+                embeddings,
+                emb_valid,
+                [det.landmarks for det in quality_detections],
+            )
             self.stats["detections_run"] += 1
             
             # =========================
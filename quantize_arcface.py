@@ -0,0 +1,146 @@
+"""
+Offline reduced-precision builds of the ArcFace recognizer model.
+
+--precision int8 (default): writes <model>.int8.onnx (static QDQ: int8
+weights, uint8 activations); ArcFaceRecognizer loads it on CPU.
+--precision fp16: writes <model>.fp16.onnx (float16 weights and I/O, needs
+onnxconverter-common); ArcFaceRecognizer loads it on CUDA.
+
+Uses aligned 112x112 face crops (e.g. saved from align_face). INT8 calibrates
+on the first --calib-count of them; the rest are held out to check that the
+new embeddings stay within --max-drift cosine distance of FP32. Otherwise the
+output is deleted, since stored embeddings come from the FP32 model on the
+backend.
+
+Usage:
+    python quantize_arcface.py --crops data/aligned_crops [--model path/to/w600k_r50.onnx]
+    python quantize_arcface.py --crops data/aligned_crops --precision fp16
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from config import Config
+from vision.recognizer import ArcFaceRecognizer, fp16_model_path, int8_model_path
+
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+except ImportError:
+    ort = None
+    CalibrationDataReader = object
+
+
+class FaceCropReader(CalibrationDataReader):
+    """Feeds preprocessed face crops to the calibrator one at a time."""
+    
+    def __init__(self, recognizer: ArcFaceRecognizer, crops: list, input_name: str):
+        self._recognizer = recognizer
+        self._crops = iter(crops)
+        self._input_name = input_name
+    
+    def get_next(self):
+        crop = next(self._crops, None)
+        if crop is None:
+            return None
+        return {self._input_name: self._recognizer._preprocess(crop)}
+
+
+def load_crops(crops_dir: str) -> list:
+    """Load all images in crops_dir (sorted, so the held-out split is stable)."""
+    crops = []
+    for path in sorted(Path(crops_dir).iterdir()):
+        if path.suffix.lower() not in (".jpg", ".jpeg", ".png", ".bmp"):
+            continue
+        image = cv2.imread(str(path))
+        if image is not None:
+            crops.append(image)
+    return crops
+
+
+def main():
+    config = Config()
+    
+    parser = argparse.ArgumentParser(description="Build an INT8 or FP16 ArcFace model")
+    parser.add_argument("--model", default=config.ARCFACE_MODEL_PATH, help="FP32 ArcFace ONNX model")
+    parser.add_argument("--precision", choices=("int8", "fp16"), default="int8")
+    parser.add_argument("--crops", required=True, help="Directory of aligned 112x112 face crops")
+    parser.add_argument("--calib-count", type=int, default=200, help="Crops used for calibration")
+    parser.add_argument("--max-drift", type=float, default=0.01,
+                        help="Max allowed 1 - cos(fp32, int8) on held-out crops")
+    args = parser.parse_args()
+    
+    if ort is None:
+        print("❌ onnxruntime (with onnxruntime.quantization) is required")
+        return 1
+    
+    crops = load_crops(args.crops)
+    if len(crops) < 2:
+        print(f"❌ Need at least 2 face crops in {args.crops}, found {len(crops)}")
+        return 1
+    
+    # Hold out the crops after the calibration set (at least one) for validation
+    calib_count = min(args.calib_count, len(crops) - 1)
+    calib, held_out = crops[:calib_count], crops[calib_count:]
+    
+    fp32 = ArcFaceRecognizer(model_path=args.model, prefer_int8=False, prefer_fp16=False)
+    if fp32._session is None:
+        print("❌ Failed to load FP32 model")
+        return 1
+    
+    if args.precision == "int8":
+        output_path = int8_model_path(args.model)
+        print(f"Calibrating on {len(calib)} crops: {args.model} -> {output_path}")
+        quantize_static(
+            args.model,
+            output_path,
+            FaceCropReader(fp32, calib, fp32._input_name),
+            quant_format=QuantFormat.QDQ,
+            weight_type=QuantType.QInt8,
+            activation_type=QuantType.QUInt8,
+        )
+    else:
+        try:
+            import onnx
+            from onnxconverter_common import float16
+        except ImportError:
+            print("❌ onnx and onnxconverter-common are required for --precision fp16")
+            return 1
+        output_path = fp16_model_path(args.model)
+        print(f"Converting to float16: {args.model} -> {output_path}")
+        onnx.save(float16.convert_float_to_float16(onnx.load(args.model)), output_path)
+        held_out = crops  # No calibration: validate on every crop
+    
+    # Validate embedding drift against FP32 on the held-out crops
+    reduced = ArcFaceRecognizer(model_path=output_path, prefer_int8=False, prefer_fp16=False)
+    if reduced._session is None:
+        print(f"❌ Failed to load {output_path}")
+        return 1
+    drifts = np.array([
+        1.0 - float(np.dot(fp32.get_embedding(crop), reduced.get_embedding(crop)))
+        for crop in held_out
+    ])
+    print(f"Cosine drift on {len(held_out)} held-out crops: "
+          f"mean {drifts.mean():.4f}, max {drifts.max():.4f}")
+    
+    if drifts.max() > args.max_drift:
+        os.remove(output_path)
+        print(f"❌ Drift exceeds {args.max_drift}; removed {output_path}")
+        return 1
+    
+    print(f"✅ Wrote {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
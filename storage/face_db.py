@@ -6,6 +6,9 @@ Stores face embeddings locally and syncs with backend.
 import json
 import os
 import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from dataclasses import dataclass
 from typing import Optional, List, Tuple
 import logging
@@ -21,6 +24,11 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Status codebook for the per-idx status array
+STATUS_NAMES = ("AUTHORIZED", "WANTED", "UNKNOWN")
+_STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+_STATUS_EMPTY = len(STATUS_NAMES)  # Unused or removed idx slot
+
 
 @dataclass
 class FaceRecord:
@@ -49,6 +57,13 @@ class FaceDatabase:
     Falls back to brute-force numpy if hnswlib unavailable.
     """
     
+    # Production HNSW parameters for gate-sized galleries (<10k faces, 512-D)
+    GATE_M = 24
+    GATE_EF_CONSTRUCTION = 200
+    GATE_EF_SEARCH = 64
+    # Live faces compared exactly per recall check (bounds its cost under the lock)
+    RECALL_SAMPLE_SIZE = 256
+    
     def __init__(
         self,
         index_path: str = "data/faces.index",
@@ -56,9 +71,31 @@ class FaceDatabase:
         version_path: str = "data/sync_version.txt",
         dimension: int = 512,
         max_elements: int = 10000,
-        ef_construction: int = 200,
-        m: int = 16
+        ef_construction: int = GATE_EF_CONSTRUCTION,
+        m: int = GATE_M,
+        ef_search: int = GATE_EF_SEARCH,
+        adaptive_ef: bool = False,
+        target_latency_ms: float = 2.0,
+        min_ef: int = 16,
+        max_ef: int = 256,
+        recall_sample_interval: int = 50,
     ):
+        """
+        Args:
+            index_path: hnswlib index file
+            metadata_path: Face metadata JSON file
+            version_path: Sync version file
+            dimension: Embedding dimension
+            max_elements: Index capacity
+            ef_construction: HNSW build-time candidate list size (higher = better graph, slower build)
+            m: HNSW graph degree (higher = better recall, more memory)
+            ef_search: HNSW query-time candidate list size (higher = better recall, slower query)
+            adaptive_ef: Adjust ef_search at runtime from observed latency and sampled recall
+            target_latency_ms: Median query latency the adaptive ef aims to stay under
+            min_ef: Lower bound for adaptive ef_search
+            max_ef: Upper bound for adaptive ef_search
+            recall_sample_interval: Check recall against brute force every N queries
+        """
         self.index_path = index_path
         self.metadata_path = metadata_path
         self.version_path = version_path
@@ -66,16 +103,38 @@ class FaceDatabase:
         self.max_elements = max_elements
         self.ef_construction = ef_construction
         self.m = m
+        self.ef_search = ef_search
+        
+        # Adaptive ef_search state
+        self.adaptive_ef = adaptive_ef
+        self.target_latency_ms = target_latency_ms
+        self.min_ef = min_ef
+        self.max_ef = max_ef
+        self.recall_sample_interval = recall_sample_interval
+        self._latencies_ms: deque = deque(maxlen=32)  # Recent query latencies
+        self._query_count = 0
+        self._recall_ok = True
         
         self._lock = threading.RLock()  # Reentrant lock for nested calls
-        self._metadata: dict[int, dict] = {}  # idx -> {face_id, user_id, name, status}
         self._face_id_to_idx: dict[str, int] = {}  # face_id -> idx
         self._next_idx = 0
         self._current_version = "0"  # String version (ISO timestamp or "0")
         
+        # Batch state: saves requested inside batch() are deferred to its end
+        self._batch_depth = 0
+        self._batch_dirty = False
+        
+        # Face metadata as parallel per-idx arrays (struct-of-arrays)
+        # A None face_id marks a removed/unused idx slot
+        self._face_ids: list[Optional[str]] = []
+        self._user_ids: list[Optional[str]] = []
+        self._names: list[Optional[str]] = []
+        self._status_codes = np.full(max_elements, _STATUS_EMPTY, dtype=np.uint8)
+        
         # hnswlib index or fallback embeddings array
         self._index = None
         self._embeddings: Optional[np.ndarray] = None  # Fallback storage
+        self._dist_buf: Optional[np.ndarray] = None  # Fallback per-query distance buffer
         
         # Ensure data directory exists
         os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
@@ -86,16 +145,20 @@ class FaceDatabase:
     def _init_index(self):
         """Initialize hnswlib index or fallback."""
         if hnswlib:
-            self._index = hnswlib.Index(space="cosine", dim=self.dim)
+            # Inner-product space: every stored vector and query is L2-normalized
+            # before it reaches the index (add_face/search), so 1 - dot is the
+            # cosine distance without hnswlib re-normalizing per call
+            self._index = hnswlib.Index(space="ip", dim=self.dim)
             self._index.init_index(
                 max_elements=self.max_elements,
                 ef_construction=self.ef_construction,
                 M=self.m
             )
-            self._index.set_ef(50)  # Query-time parameter
+            self._index.set_ef(self.ef_search)  # Query-time parameter
         else:
             # Fallback: store embeddings in numpy array
             self._embeddings = np.zeros((0, self.dim), dtype=np.float32)
+            self._dist_buf = np.empty(self.max_elements, dtype=np.float32)
     
     def _load(self):
         """Load existing index and metadata from disk."""
@@ -105,10 +168,12 @@ class FaceDatabase:
                 try:
                     with open(self.metadata_path, "r") as f:
                         data = json.load(f)
-                    self._metadata = {int(k): v for k, v in data.get("metadata", {}).items()}
+                    metadata = data.get("metadata", {})
                     self._face_id_to_idx = data.get("face_id_to_idx", {})
                     self._next_idx = data.get("next_idx", 0)
-                    logger.info(f"Loaded {len(self._metadata)} face records from metadata")
+                    for k, meta in metadata.items():
+                        self._set_row(int(k), meta["face_id"], meta["user_id"], meta["name"], meta["status"])
+                    logger.info(f"Loaded {len(metadata)} face records from metadata")
                 except Exception as e:
                     logger.error(f"Failed to load metadata: {e}")
             
@@ -116,6 +181,7 @@ class FaceDatabase:
             if hnswlib and os.path.exists(self.index_path):
                 try:
                     self._index.load_index(self.index_path, max_elements=self.max_elements)
+                    self._index.set_ef(self.ef_search)
                     logger.info(f"Loaded hnswlib index from {self.index_path}")
                 except Exception as e:
                     logger.error(f"Failed to load index: {e}")
@@ -131,12 +197,26 @@ class FaceDatabase:
                     logger.warning(f"Failed to load version: {e}")
     
     def _save(self):
-        """Save index and metadata to disk."""
+        """Save index and metadata to disk (deferred while inside batch())."""
         with self._lock:
+            if self._batch_depth:
+                self._batch_dirty = True
+                return
+            
             # Save metadata
             try:
+                metadata = {
+                    idx: {
+                        "face_id": face_id,
+                        "user_id": self._user_ids[idx],
+                        "name": self._names[idx],
+                        "status": STATUS_NAMES[self._status_codes[idx]]
+                    }
+                    for idx, face_id in enumerate(self._face_ids)
+                    if face_id is not None
+                }
                 data = {
-                    "metadata": self._metadata,
+                    "metadata": metadata,
                     "face_id_to_idx": self._face_id_to_idx,
                     "next_idx": self._next_idx
                 }
@@ -159,6 +239,35 @@ class FaceDatabase:
             except Exception as e:
                 logger.error(f"Failed to save version: {e}")
     
+    def _set_row(self, idx: int, face_id: str, user_id: str, name: str, status: str):
+        """Write one record into the parallel per-idx arrays."""
+        if idx >= len(self._face_ids):
+            grow = idx + 1 - len(self._face_ids)
+            self._face_ids.extend([None] * grow)
+            self._user_ids.extend([None] * grow)
+            self._names.extend([None] * grow)
+        if idx >= len(self._status_codes):
+            grown = np.full(max(idx + 1, 2 * len(self._status_codes)), _STATUS_EMPTY, dtype=np.uint8)
+            grown[:len(self._status_codes)] = self._status_codes
+            self._status_codes = grown
+        
+        self._face_ids[idx] = face_id
+        self._user_ids[idx] = user_id
+        self._names[idx] = name
+        # Statuses arrive in any case ("authorized"); the gate compares upper-cased
+        code = _STATUS_CODES.get(str(status).upper())
+        if code is None:
+            logger.warning(f"Face {face_id}: unrecognized status {status!r}, stored as UNKNOWN")
+            code = _STATUS_CODES["UNKNOWN"]
+        self._status_codes[idx] = code
+    
+    def _clear_rows(self):
+        """Reset the parallel per-idx arrays."""
+        self._face_ids = []
+        self._user_ids = []
+        self._names = []
+        self._status_codes[:] = _STATUS_EMPTY
+    
     def get_version(self) -> str:
         """Get current sync version (ISO timestamp or '0')."""
         return self._current_version
@@ -187,20 +296,15 @@ class FaceDatabase:
                 logger.error(f"Invalid embedding dimension: {embedding.shape[0]} != {self.dim}")
                 return False
             
-            norm = np.linalg.norm(embedding)
+            norm = float(np.sqrt(np.vdot(embedding, embedding)))
             if norm > 0:
-                embedding = embedding / norm
+                embedding *= 1.0 / norm
             
             # Check if face already exists
             if face_id in self._face_id_to_idx:
                 # Update existing
                 idx = self._face_id_to_idx[face_id]
-                self._metadata[idx] = {
-                    "face_id": face_id,
-                    "user_id": user_id,
-                    "name": name,
-                    "status": status
-                }
+                self._set_row(idx, face_id, user_id, name, status)
                 # Note: hnswlib doesn't support update, would need to rebuild
                 # For simplicity, we skip embedding update (status updates are main concern)
                 logger.info(f"Updated face {face_id} metadata")
@@ -209,13 +313,8 @@ class FaceDatabase:
                 idx = self._next_idx
                 self._next_idx += 1
                 
-                self._metadata[idx] = {
-                    "face_id": face_id,
-                    "user_id": user_id,
-                    "name": name,
-                    "status": status
-                }
                 self._face_id_to_idx[face_id] = idx
+                self._set_row(idx, face_id, user_id, name, status)
                 
                 if hnswlib:
                     self._index.add_items(embedding.reshape(1, -1), np.array([idx]))
@@ -231,6 +330,31 @@ class FaceDatabase:
         """Public method to save database to disk."""
         self._save()
     
+    @contextmanager
+    def batch(self):
+        """
+        Group mutations so they are applied under one lock and persisted once.
+        
+        Any save requested inside the block (save(), set_version(), ...) is
+        deferred and performed a single time when the outermost batch exits,
+        so the index, metadata and version land on disk together.
+        
+        Usage:
+            with face_db.batch():
+                face_db.remove_face(...)
+                face_db.add_face(...)
+                face_db.set_version(...)
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._batch_dirty:
+                    self._batch_dirty = False
+                    self._save()
+    
     def remove_face(self, face_id: str) -> bool:
         """Remove a face from the database."""
         with self._lock:
@@ -238,15 +362,99 @@ class FaceDatabase:
                 return False
             
             idx = self._face_id_to_idx[face_id]
-            del self._metadata[idx]
             del self._face_id_to_idx[face_id]
-            
-            # Note: hnswlib mark_deleted would work but we keep it simple
-            # Full rebuild on next sync if needed
+            self._face_ids[idx] = None
+            self._status_codes[idx] = _STATUS_EMPTY
+            self._mark_deleted(idx)
             
             logger.info(f"Removed face {face_id}")
             return True
     
+    def _mark_deleted(self, idx: int):
+        """Hide a removed idx from ANN queries (hnswlib keeps the slot, skips it in results)."""
+        if hnswlib:
+            try:
+                self._index.mark_deleted(idx)
+            except RuntimeError:
+                pass  # Already marked, or never inserted
+    
+    def add_faces_bulk(
+        self,
+        face_ids: List[str],
+        user_ids: List[str],
+        names: List[str],
+        statuses: List[str],
+        embeddings: np.ndarray
+    ) -> int:
+        """
+        Add or update many faces at once.
+        
+        Same semantics as add_face, but normalization is one vectorized pass over
+        the (N, dim) batch and new faces go into the index with a single add_items.
+        
+        Args:
+            face_ids, user_ids, names, statuses: Per-face metadata (length N)
+            embeddings: (N, dim) array, row i belongs to face_ids[i]
+        
+        Returns:
+            Number of faces added or updated
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(face_ids), -1)
+        if embeddings.shape[1] != self.dim:
+            logger.error(f"Invalid embedding dimension: {embeddings.shape[1]} != {self.dim}")
+            return 0
+        
+        # Normalize all rows at once (zero rows left as-is)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings = embeddings / norms
+        
+        with self._lock:
+            new_rows = []
+            new_idxs = []
+            for i, face_id in enumerate(face_ids):
+                idx = self._face_id_to_idx.get(face_id)
+                if idx is None:
+                    # Add new
+                    idx = self._next_idx
+                    self._next_idx += 1
+                    self._face_id_to_idx[face_id] = idx
+                    new_rows.append(i)
+                    new_idxs.append(idx)
+                # Existing faces: metadata update only (see add_face)
+                self._set_row(idx, face_id, user_ids[i], names[i], statuses[i])
+            
+            if new_rows:
+                if hnswlib:
+                    # One batched insert; hnswlib releases the GIL and builds links on all cores
+                    self._index.add_items(embeddings[new_rows], np.asarray(new_idxs), num_threads=-1)
+                else:
+                    # Fallback
+                    self._embeddings = np.vstack([self._embeddings, embeddings[new_rows]])
+            
+            logger.info(
+                f"Bulk upsert: {len(new_rows)} added, "
+                f"{len(face_ids) - len(new_rows)} updated"
+            )
+            return len(face_ids)
+    
+    def remove_faces_bulk(self, face_ids: List[str]) -> int:
+        """Remove many faces under one lock. Returns number removed."""
+        with self._lock:
+            removed = 0
+            for face_id in face_ids:
+                idx = self._face_id_to_idx.pop(face_id, None)
+                if idx is None:
+                    continue
+                self._face_ids[idx] = None
+                self._status_codes[idx] = _STATUS_EMPTY
+                self._mark_deleted(idx)
+                removed += 1
+            
+            if removed:
+                logger.info(f"Removed {removed} faces")
+            return removed
+    
     def search(
         self,
         embedding: np.ndarray,
@@ -266,67 +474,270 @@ class FaceDatabase:
             List of (person_id, distance, metadata) tuples sorted by distance
         """
         with self._lock:
-            if not self._metadata:
+            if not self._face_id_to_idx:
                 return []
             
             # Normalize query
             embedding = embedding.astype(np.float32).flatten()
-            norm = np.linalg.norm(embedding)
+            norm = float(np.sqrt(np.vdot(embedding, embedding)))
             if norm > 0:
-                embedding = embedding / norm
+                embedding *= 1.0 / norm
             
             results = []
             
             if hnswlib and self._index.get_current_count() > 0:
                 try:
+                    start = time.perf_counter()
                     labels, distances = self._index.knn_query(
                         embedding.reshape(1, -1),
-                        k=min(k, self._index.get_current_count())
+                        k=min(k, len(self._face_id_to_idx))  # Live faces only
                     )
+                    if self.adaptive_ef:
+                        self._adapt_ef(embedding, labels[0], (time.perf_counter() - start) * 1000)
                     
-                    for idx, dist in zip(labels[0], distances[0]):
-                        if idx in self._metadata and dist <= threshold:
-                            meta = self._metadata[idx]
-                            # Return as (person_id, distance, metadata)
-                            results.append((
-                                meta["face_id"],
-                                float(dist),
-                                {
-                                    "face_id": meta["face_id"],
-                                    "user_id": meta["user_id"],
-                                    "full_name": meta["name"],
-                                    "status": meta["status"]
-                                }
-                            ))
+                    results = self._collect_matches(labels[0], distances[0], threshold)
                 except Exception as e:
                     logger.error(f"Search error: {e}")
             
             elif self._embeddings is not None and len(self._embeddings) > 0:
-                # Brute-force fallback
-                distances = 1 - np.dot(self._embeddings, embedding)  # Cosine distance
-                sorted_idxs = np.argsort(distances)[:k]
+                # Brute-force fallback: GEMV into a persistent buffer, no per-query allocation
+                n = len(self._embeddings)
+                if len(self._dist_buf) < n:
+                    self._dist_buf = np.empty(max(n, 2 * len(self._dist_buf)), dtype=np.float32)
+                distances = self._dist_buf[:n]
+                np.dot(self._embeddings, embedding, out=distances)
+                np.subtract(1.0, distances, out=distances)  # Cosine distance
                 
-                for idx in sorted_idxs:
-                    dist = distances[idx]
-                    if int(idx) in self._metadata and dist <= threshold:
-                        meta = self._metadata[int(idx)]
-                        results.append((
-                            meta["face_id"],
-                            float(dist),
-                            {
-                                "face_id": meta["face_id"],
-                                "user_id": meta["user_id"],
-                                "full_name": meta["name"],
-                                "status": meta["status"]
-                            }
-                        ))
+                k = min(k, n)
+                if k < n:
+                    top = np.argpartition(distances, k - 1)[:k]
+                    sorted_idxs = top[np.argsort(distances[top])]
+                else:
+                    sorted_idxs = np.argsort(distances)
+                results = self._collect_matches(sorted_idxs, distances[sorted_idxs], threshold)
             
             return results
     
+    def verify(
+        self,
+        face_id: str,
+        embedding: np.ndarray,
+        threshold: float = 0.5
+    ) -> Optional[MatchResult]:
+        """
+        Check a query embedding against one known face (no ANN search).
+        
+        Use when the caller already has a candidate identity (e.g. a track's
+        last match); costs a single dot product. Fall back to search() on None.
+        
+        Args:
+            face_id: Candidate face ID
+            embedding: Query face embedding (512-dim)
+            threshold: Max cosine distance for a match
+        
+        Returns:
+            MatchResult if the candidate exists and is within threshold, else None
+        """
+        with self._lock:
+            idx = self._face_id_to_idx.get(face_id)
+            if idx is None:
+                return None
+            
+            embedding = embedding.astype(np.float32).flatten()
+            norm = float(np.sqrt(np.vdot(embedding, embedding)))
+            if norm > 0:
+                embedding *= 1.0 / norm
+            
+            try:
+                if hnswlib:
+                    stored = np.asarray(self._index.get_items([idx]), dtype=np.float32)[0]
+                else:
+                    stored = self._embeddings[idx]
+            except Exception as e:
+                logger.debug(f"Verify lookup failed for {face_id}: {e}")
+                return None
+            
+            distance = float(1.0 - np.dot(stored, embedding))
+            if distance > threshold:
+                return None
+            
+            return MatchResult(
+                face_id=face_id,
+                user_id=self._user_ids[idx],
+                name=self._names[idx],
+                status=STATUS_NAMES[self._status_codes[idx]],
+                distance=distance,
+                confidence=1.0 - distance
+            )
+    
+    def search_batch(
+        self,
+        embeddings: np.ndarray,
+        k: int = 1,
+        threshold: float = 0.5
+    ) -> List[List[Tuple[str, float, dict]]]:
+        """
+        Search for matching faces for several query embeddings at once.
+        
+        Issues a single batched knn_query (hnswlib parallelizes across rows)
+        or a single matrix product in the brute-force fallback, instead of
+        one call per face.
+        
+        Args:
+            embeddings: Query embeddings (B x 512)
+            k: Number of nearest neighbors per query
+            threshold: Max cosine distance (0 = identical, 2 = opposite)
+        
+        Returns:
+            One list of (person_id, distance, metadata) tuples per query row
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        n_queries = embeddings.shape[0]
+        
+        with self._lock:
+            if not self._face_id_to_idx or n_queries == 0:
+                return [[] for _ in range(n_queries)]
+            
+            # Normalize all queries in one pass
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            embeddings = embeddings / norms
+            
+            results: List[List[Tuple[str, float, dict]]] = [[] for _ in range(n_queries)]
+            
+            if hnswlib and self._index.get_current_count() > 0:
+                try:
+                    labels, distances = self._index.knn_query(
+                        embeddings,
+                        k=min(k, len(self._face_id_to_idx)),  # Live faces only
+                        num_threads=-1
+                    )
+                    
+                    for row in range(n_queries):
+                        results[row] = self._collect_matches(labels[row], distances[row], threshold)
+                except Exception as e:
+                    logger.error(f"Batch search error: {e}")
+            
+            elif self._embeddings is not None and len(self._embeddings) > 0:
+                # Brute-force fallback: one GEMM for the whole batch
+                distances = 1 - self._embeddings @ embeddings.T  # (N, B) cosine distance
+                
+                for row in range(n_queries):
+                    row_dist = distances[:, row]
+                    sorted_idxs = np.argsort(row_dist)[:k]
+                    results[row] = self._collect_matches(sorted_idxs, row_dist[sorted_idxs], threshold)
+            
+            return results
+    
+    def tune_for_gate(self):
+        """
+        Apply the production HNSW parameters for gate-sized galleries.
+        
+        ef_search takes effect immediately; M and ef_construction apply the
+        next time the index is built (e.g. on full sync).
+        """
+        with self._lock:
+            self.m = self.GATE_M
+            self.ef_construction = self.GATE_EF_CONSTRUCTION
+            self.set_ef_search(self.GATE_EF_SEARCH)
+    
+    def set_ef_search(self, ef: int):
+        """Set HNSW query-time candidate list size."""
+        with self._lock:
+            self.ef_search = int(ef)
+            if hnswlib and self._index is not None:
+                self._index.set_ef(self.ef_search)
+    
+    def _adapt_ef(self, embedding: np.ndarray, labels: np.ndarray, latency_ms: float):
+        """
+        Adjust ef_search from recent query latency and sampled recall.
+        
+        Lowers ef toward min_ef when median latency exceeds the target;
+        raises it toward max_ef when latency has headroom but a sampled
+        brute-force check shows the ANN top-1 was wrong.
+        """
+        self._query_count += 1
+        
+        if self._query_count % self.recall_sample_interval == 0:
+            # Not a representative query: its caller also waits for the check
+            self._recall_ok = self._check_recall(embedding, labels)
+        else:
+            self._latencies_ms.append(latency_ms)
+        
+        if len(self._latencies_ms) < self._latencies_ms.maxlen:
+            return
+        
+        p50 = float(np.median(self._latencies_ms))
+        ef = self.ef_search
+        if p50 > self.target_latency_ms:
+            ef = max(self.min_ef, int(ef * 0.8))
+        elif not self._recall_ok:
+            ef = min(self.max_ef, int(ef * 1.25) + 1)
+            self._recall_ok = True
+        
+        if ef != self.ef_search:
+            logger.info(f"Adaptive ef_search: {self.ef_search} -> {ef} (p50={p50:.2f}ms)")
+            self.set_ef_search(ef)
+            self._latencies_ms.clear()
+    
+    def _check_recall(self, embedding: np.ndarray, labels: np.ndarray) -> bool:
+        """
+        Check the ANN top-1 against a random sample of up to RECALL_SAMPLE_SIZE live faces.
+        
+        Fails if any sampled face is more similar than the ANN top-1. A bounded
+        sample keeps the check cheap at any gallery size; over many checks it
+        still catches a systematically low recall.
+        """
+        try:
+            if len(labels) == 0 or self._next_idx == 0:
+                return True
+            ids = np.random.randint(0, self._next_idx, size=min(self.RECALL_SAMPLE_SIZE, self._next_idx))
+            ids = np.unique(ids)
+            ids = ids[self._status_codes[ids] != _STATUS_EMPTY]  # Live faces only
+            if len(ids) == 0:
+                return True
+            top1 = int(labels[0])
+            vectors = np.asarray(self._index.get_items(np.append(ids, top1)), dtype=np.float32)
+            sims = vectors @ embedding
+            return bool(sims[:-1].max() <= sims[-1] + 1e-6)
+        except Exception as e:
+            logger.debug(f"Recall check failed: {e}")
+            return True
+    
+    def _collect_matches(
+        self,
+        idxs: np.ndarray,
+        dists: np.ndarray,
+        threshold: float
+    ) -> List[Tuple[str, float, dict]]:
+        """Build (person_id, distance, metadata) tuples for indices within threshold."""
+        idxs = np.asarray(idxs)
+        dists = np.asarray(dists)
+        keep = dists <= threshold
+        
+        face_ids = self._face_ids
+        n_rows = len(face_ids)
+        matches = []
+        for idx, dist in zip(idxs[keep].tolist(), dists[keep].tolist()):
+            face_id = face_ids[idx] if idx < n_rows else None
+            if face_id is None:
+                continue
+            matches.append((
+                face_id,
+                dist,
+                {
+                    "face_id": face_id,
+                    "user_id": self._user_ids[idx],
+                    "full_name": self._names[idx],
+                    "status": STATUS_NAMES[self._status_codes[idx]]
+                }
+            ))
+        return matches
+    
     def count(self) -> int:
         """Return the number of faces in the database."""
         with self._lock:
-            return len(self._metadata)
+            return len(self._face_id_to_idx)
             
             return results
     
@@ -341,41 +752,55 @@ class FaceDatabase:
         """
         logger.info(f"Syncing {len(faces)} faces from backend (version {version})")
         
-        # Clear and rebuild
-        with self._lock:
-            self._metadata.clear()
-            self._face_id_to_idx.clear()
-            self._next_idx = 0
-            self._init_index()
-        
-        # Add all faces
+        # Collect valid faces into preallocated rows (outside the lock)
+        embeddings = np.empty((len(faces), self.dim), dtype=np.float32)
+        face_ids, user_ids, names, statuses = [], [], [], []
         for face in faces:
             try:
-                embedding = np.array(face["embedding"], dtype=np.float32)
-                self.add_face(
-                    face_id=face["face_id"],
-                    user_id=face["user_id"],
-                    name=face["name"],
-                    status=face["status"],
-                    embedding=embedding
-                )
+                embedding = face["embedding"]
+                if len(embedding) != self.dim:
+                    raise ValueError(f"embedding dimension {len(embedding)} != {self.dim}")
+                embeddings[len(face_ids)] = embedding
+                record = (face["face_id"], face["user_id"], face["name"], face["status"])
             except Exception as e:
                 logger.error(f"Failed to add face {face.get('face_id')}: {e}")
+                continue
+            face_ids.append(record[0])
+            user_ids.append(record[1])
+            names.append(record[2])
+            statuses.append(record[3])
         
-        self._current_version = version
-        self._save()
-        logger.info(f"Sync complete. {len(self._metadata)} faces loaded.")
+        # Clear and rebuild as one batch: searches never see the empty
+        # intermediate index, and index/metadata/version are saved once
+        with self.batch():
+            self._face_id_to_idx.clear()
+            self._clear_rows()
+            self._next_idx = 0
+            self._init_index()
+            
+            if face_ids:
+                self.add_faces_bulk(face_ids, user_ids, names, statuses, embeddings[:len(face_ids)])
+            
+            self._current_version = version
+            self._save()
+        
+        logger.info(f"Sync complete. {len(self._face_id_to_idx)} faces loaded.")
     
     def get_stats(self) -> dict:
         """Get database statistics."""
         with self._lock:
-            status_counts = {}
-            for meta in self._metadata.values():
-                status = meta.get("status", "UNKNOWN")
-                status_counts[status] = status_counts.get(status, 0) + 1
+            counts = np.bincount(
+                self._status_codes[:self._next_idx],
+                minlength=_STATUS_EMPTY + 1
+            )
+            status_counts = {
+                STATUS_NAMES[code]: int(counts[code])
+                for code in range(len(STATUS_NAMES))
+                if counts[code] > 0
+            }
             
             return {
-                "total_faces": len(self._metadata),
+                "total_faces": len(self._face_id_to_idx),
                 "version": self._current_version,
                 "status_counts": status_counts
             }
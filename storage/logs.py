@@ -18,6 +18,11 @@ import cv2
 
 logger = logging.getLogger(__name__)
 
+# SQLite storage tuning for SD-card backed deployments
+PAGE_SIZE = 16384                 # Match typical SD erase block better than the 4 KB default
+JOURNAL_SIZE_LIMIT = 8 * 1024 * 1024
+INCREMENTAL_VACUUM_PAGES = 1000   # Pages returned to the OS after each cleanup
+
 
 @dataclass
 class AccessEvent:
@@ -50,16 +55,56 @@ class AccessLogger:
     def __init__(self, db_path: str = "data/logs.db"):
         self.db_path = db_path
         self._lock = threading.Lock()
+        # Set once an existing DB still needs the page_size/auto_vacuum conversion
+        self._needs_storage_conversion = False
         
         # Ensure directory exists
         os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
         
         self._init_db()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with per-connection pragmas applied."""
+        conn = sqlite3.connect(self.db_path)
+        # Not persistent: bounds the WAL file left behind after checkpoints
+        conn.execute(f"PRAGMA journal_size_limit = {JOURNAL_SIZE_LIMIT}")
+        return conn
+    
+    def _configure_storage(self, conn: sqlite3.Connection, created: bool):
+        """
+        Apply persistent storage pragmas.
+        
+        page_size and auto_vacuum take effect for free on a new database, but
+        an existing one needs a full VACUUM (before switching to WAL). That
+        can take long on a large log, so it is not done here; it is deferred
+        to cleanup_old_events.
+        """
+        if created:
+            conn.execute(f"PRAGMA page_size = {PAGE_SIZE}")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        else:
+            self._needs_storage_conversion = (
+                conn.execute("PRAGMA page_size").fetchone()[0] != PAGE_SIZE
+            )
+        
+        conn.execute("PRAGMA journal_mode = WAL")
+    
+    def _convert_storage(self, conn: sqlite3.Connection):
+        """One-off VACUUM of an existing DB to PAGE_SIZE pages and incremental auto_vacuum."""
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute(f"PRAGMA page_size = {PAGE_SIZE}")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA journal_mode = WAL")
+        self._needs_storage_conversion = False
+        logger.info(f"Converted access log storage (page_size={PAGE_SIZE}, incremental vacuum)")
+    
     def _init_db(self):
         """Initialize database schema."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            created = not os.path.exists(self.db_path)
+            conn = self._connect()
+            self._configure_storage(conn, created)
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -97,8 +142,13 @@ class AccessLogger:
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_timestamp ON access_events(timestamp)
             """)
+            # Partial covering index for the sync drain: satisfies both the
+            # synced = 0 filter and the ORDER BY timestamp, and only holds
+            # unsynced rows so it stays small
+            cursor.execute("DROP INDEX IF EXISTS idx_synced")
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_synced ON access_events(synced)
+                CREATE INDEX IF NOT EXISTS idx_unsynced
+                ON access_events(synced, timestamp) WHERE synced = 0
             """)
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_status ON access_events(status)
@@ -184,7 +234,7 @@ class AccessLogger:
             face_crop_b64 = self._encode_face_crop(frame, bbox)
         
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -211,7 +261,7 @@ class AccessLogger:
     def get_unsynced_events(self, limit: int = 100) -> list[AccessEvent]:
         """Get events that haven't been synced to backend."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -251,15 +301,14 @@ class AccessLogger:
             return
         
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            placeholders = ",".join("?" * len(event_ids))
-            cursor.execute(f"""
-                UPDATE access_events
-                SET synced = 1
-                WHERE id IN ({placeholders})
-            """, event_ids)
+            # One prepared statement reused for every id (no per-call SQL build)
+            cursor.executemany(
+                "UPDATE access_events SET synced = 1 WHERE id = ?",
+                [(event_id,) for event_id in event_ids]
+            )
             
             conn.commit()
             conn.close()
@@ -273,7 +322,7 @@ class AccessLogger:
     ) -> list[AccessEvent]:
         """Get recent access events for display."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             if status_filter:
@@ -317,7 +366,7 @@ class AccessLogger:
     def get_stats(self) -> dict:
         """Get logging statistics."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Total events
@@ -355,7 +404,7 @@ class AccessLogger:
     def cleanup_old_events(self, days: int = 30):
         """Delete events older than specified days (keeps DB small)."""
         with self._lock:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -366,6 +415,14 @@ class AccessLogger:
             
             deleted = cursor.rowcount
             conn.commit()
+            
+            if self._needs_storage_conversion:
+                # Maintenance path: the full VACUUM also drops the deleted rows' pages
+                self._convert_storage(conn)
+            elif deleted > 0:
+                # Give freed pages back to the filesystem so the DB shrinks
+                conn.execute(f"PRAGMA incremental_vacuum({INCREMENTAL_VACUUM_PAGES})").fetchall()
+            
             conn.close()
             
             if deleted > 0:
@@ -3,14 +3,20 @@ Stream Thread - Handles LiveKit video streaming for admin dashboard.
 Enables remote viewing of gate camera feed.
 """
 
+import asyncio
 import threading
 import time
-import queue
+from collections import deque
 from typing import Optional
 import logging
 
 import numpy as np
 
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
 # LiveKit SDK (optional)
 try:
     from livekit import rtc
@@ -18,9 +24,31 @@ try:
 except ImportError:
     LIVEKIT_AVAILABLE = False
 
+# Numba JIT (optional) - parallel BGR->RGB kernel for the RGB24 path
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 
 logger = logging.getLogger(__name__)
 
+# Published pixel formats, cheapest for the encoder first. A requested format the
+# installed LiveKit SDK lacks falls back to the first supported one in this order.
+PIXEL_FORMAT_PREFERENCE = ("I420", "RGB24")
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True, boundscheck=False)
+    def _bgr_to_rgb_numba(src, dst):
+        """Swap B and R of an (H, W, 3) uint8 frame into dst, rows split across cores."""
+        for y in prange(src.shape[0]):
+            for x in range(src.shape[1]):
+                dst[y, x, 0] = src[y, x, 2]
+                dst[y, x, 1] = src[y, x, 1]
+                dst[y, x, 2] = src[y, x, 0]
+
 
 class StreamThread(threading.Thread):
     """
@@ -31,13 +59,19 @@ class StreamThread(threading.Thread):
     
     Frame Sources (in priority order):
     1. CaptureThread's stream queue (if set) - SMOOTH, 15+ FPS
-    2. Internal frame queue (via put_frame()) - fallback
+    2. Internal latest-frame slot (via put_frame()) - fallback
     
     Architecture:
         CaptureThread → stream_queue → StreamThread → LiveKit → Admin Dashboard
                                                               (smooth 15+ FPS)
+    
+    Publishing (convert + capture_frame) runs on a dedicated asyncio loop
+    thread, so encoder/network back-pressure never eats into frame pacing.
     """
     
+    # Frames allowed queued/running on the publish loop before new ones are dropped
+    MAX_PUBLISH_IN_FLIGHT = 2
+    
     def __init__(
         self,
         livekit_url: str,
@@ -45,7 +79,8 @@ class StreamThread(threading.Thread):
         frame_width: int = 640,
         frame_height: int = 480,
         fps: int = 15,
-        capture_thread=None  # Optional: CaptureThread for smooth frames
+        capture_thread=None,  # Optional: CaptureThread for smooth frames
+        pixel_format: str = "I420",  # "I420" (1.5 B/px, encoder-native) or "RGB24"
     ):
         super().__init__(name="StreamThread", daemon=True)
         
@@ -54,15 +89,45 @@ class StreamThread(threading.Thread):
         self.frame_width = frame_width
         self.frame_height = frame_height
         self.fps = fps
+        self.pixel_format = pixel_format
+        self._active_format: Optional[str] = None  # Format actually published (set in _connect)
+        self._buffer_type = None  # Matching rtc.VideoBufferType member
         
-        # Frame source: capture thread (preferred) or internal queue (fallback)
+        # Frame source: capture thread (preferred) or internal slot (fallback).
+        # Latest frame wins: a maxlen=1 deque evicts the old frame on append, and
+        # append/popleft are each atomic, so no lock or condvar is needed.
         self._capture_thread = capture_thread
-        self._frame_queue: queue.Queue = queue.Queue(maxsize=5)
+        self._frame_slot: deque = deque(maxlen=1)
         
         self._stop_event = threading.Event()
         self._streaming = False
         self._room = None
         self._video_track = None
+        # Reused color-conversion output (allocated in _connect): _pixel_buf is an
+        # ndarray view over _pixel_bytes, so the bytes handed to LiveKit are never
+        # reallocated. Shape is (H*3/2, W) for I420, (H, W, 3) for RGB24.
+        self._pixel_bytes: Optional[bytearray] = None
+        self._pixel_buf: Optional[np.ndarray] = None
+        self._resize_buf: Optional[np.ndarray] = None  # Reused resize output for _publish_frame
+        
+        # Publish loop (started in run()); all publishing - and freeing the buffers
+        # in _disconnect - runs serially on its thread, which is what makes the
+        # shared conversion buffers above safe to reuse
+        self._publish_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._publish_loop_thread: Optional[threading.Thread] = None
+        self._publish_slots = threading.BoundedSemaphore(self.MAX_PUBLISH_IN_FLIGHT)
+        self.frames_dropped = 0
+        # Bumped by each _connect; a teardown queued by _disconnect only frees the
+        # state of the connection it was queued for (it may run after a reconnect)
+        self._connection_gen = 0
+        self._connection_lock = threading.Lock()
+        
+        # OpenCV functions bound once (attribute lookup instead of module chain per frame)
+        self._cvt_color = cv2.cvtColor if cv2 is not None else None
+        self._mix_channels = cv2.mixChannels if cv2 is not None else None
+        # RGB24 swap: Numba kernel spreads rows over all cores, mixChannels is single-threaded
+        self._bgr_to_rgb = _bgr_to_rgb_numba if NUMBA_AVAILABLE else self._bgr_to_rgb_cv2
+        self._resize = cv2.resize if cv2 is not None else None
         
         # Stats
         self.is_connected = False
@@ -83,29 +148,84 @@ class StreamThread(threading.Thread):
         logger.info("Stream thread started")
         
         frame_interval = 1.0 / self.fps
+        next_deadline = None
         
-        while not self._stop_event.is_set():
+        # Hot-loop lookups bound once as locals
+        stop_is_set = self._stop_event.is_set
+        wait = self._stop_event.wait
+        monotonic = time.monotonic
+        get_frame = self._get_frame
+        submit = self._submit_publish
+        
+        self._start_publish_loop()
+        
+        while not stop_is_set():
             if self._streaming and self.is_connected:
-                loop_start = time.time()
+                if next_deadline is None:
+                    next_deadline = monotonic()
                 
-                # Get frame from capture thread (preferred) or internal queue
-                frame = self._get_frame()
+                # Get frame from capture thread (preferred) or internal slot
+                frame = get_frame()
                 
                 if frame is not None:
-                    self._publish_frame(frame)
-                    self.frames_streamed += 1
+                    submit(frame)
                 
-                # Frame rate control for smooth streaming
-                elapsed = time.time() - loop_start
-                sleep_time = frame_interval - elapsed
+                # Frame rate control on a fixed monotonic schedule (no drift, immune
+                # to wall-clock steps); if we fell behind, resync instead of bursting
+                next_deadline += frame_interval
+                sleep_time = next_deadline - monotonic()
                 if sleep_time > 0:
-                    time.sleep(sleep_time)
+                    if wait(timeout=sleep_time):
+                        break
+                else:
+                    next_deadline = monotonic()
             else:
                 # Not streaming, sleep
-                self._stop_event.wait(timeout=1.0)
+                next_deadline = None
+                wait(timeout=1.0)
         
+        self._stop_publish_loop()
         self._disconnect()
-        logger.info(f"Stream thread stopped. Frames streamed: {self.frames_streamed}")
+        logger.info(
+            f"Stream thread stopped. Frames streamed: {self.frames_streamed}, "
+            f"dropped: {self.frames_dropped}"
+        )
+    
+    def _start_publish_loop(self):
+        """Start the asyncio loop thread that publishes frames."""
+        self._publish_loop = asyncio.new_event_loop()
+        self._publish_loop_thread = threading.Thread(
+            target=self._publish_loop.run_forever,
+            name="StreamPublishLoop",
+            daemon=True
+        )
+        self._publish_loop_thread.start()
+    
+    def _stop_publish_loop(self):
+        """Stop the publish loop after in-flight frames finish."""
+        if self._publish_loop is None:
+            return
+        self._publish_loop.call_soon_threadsafe(self._publish_loop.stop)
+        self._publish_loop_thread.join(timeout=2.0)
+        if not self._publish_loop.is_running():
+            self._publish_loop.close()
+        self._publish_loop = None
+        self._publish_loop_thread = None
+    
+    def _submit_publish(self, frame: np.ndarray):
+        """Hand a frame to the publish loop without waiting (drops it if the loop is backed up)."""
+        if not self._publish_slots.acquire(blocking=False):
+            self.frames_dropped += 1
+            return
+        asyncio.run_coroutine_threadsafe(self._publish_frame_async(frame), self._publish_loop)
+    
+    async def _publish_frame_async(self, frame: np.ndarray):
+        """Publish one frame on the loop thread and free its in-flight slot."""
+        try:
+            if self._publish_frame(frame):
+                self.frames_streamed += 1
+        finally:
+            self._publish_slots.release()
     
     def _get_frame(self):
         """Get frame from best available source."""
@@ -115,10 +235,10 @@ class StreamThread(threading.Thread):
             if frame is not None:
                 return frame
         
-        # Priority 2: Internal queue (fallback, may be jittery)
+        # Priority 2: Internal slot (fallback, may be jittery) - take and clear
         try:
-            return self._frame_queue.get_nowait()
-        except queue.Empty:
+            return self._frame_slot.popleft()
+        except IndexError:
             return None
     
     def stop(self):
@@ -150,32 +270,47 @@ class StreamThread(threading.Thread):
         logger.info("Streaming stopped")
     
     def push_frame(self, frame: np.ndarray):
-        """Push frame to streaming queue."""
+        """Push frame to the latest-frame slot (replaces any unconsumed frame)."""
         if not self._streaming or not self.is_connected:
             return
         
-        try:
-            # Resize if needed
-            if frame.shape[1] != self.frame_width or frame.shape[0] != self.frame_height:
-                import cv2
-                frame = cv2.resize(frame, (self.frame_width, self.frame_height))
-            
-            # Drop old frames if queue full
-            if self._frame_queue.full():
-                try:
-                    self._frame_queue.get_nowait()
-                except queue.Empty:
-                    pass
-            
-            self._frame_queue.put_nowait(frame)
-        except queue.Full:
-            pass
+        # Resize if needed (the slot must own its pixels, so no shared dst here)
+        if frame.shape[1] != self.frame_width or frame.shape[0] != self.frame_height:
+            frame = self._resize(
+                frame, (self.frame_width, self.frame_height),
+                interpolation=self._interpolation_for(frame)
+            )
+        
+        self._frame_slot.append(frame)
+    
+    def _bgr_to_rgb_cv2(self, src: np.ndarray, dst: np.ndarray):
+        """Swap B and R into dst with OpenCV (used when Numba is unavailable)."""
+        self._mix_channels([src], [dst], [0, 2, 1, 1, 2, 0])
+    
+    def _interpolation_for(self, frame: np.ndarray) -> int:
+        """INTER_AREA (box filter) for downscaling, INTER_LINEAR otherwise."""
+        if frame.shape[1] > self.frame_width or frame.shape[0] > self.frame_height:
+            return cv2.INTER_AREA
+        return cv2.INTER_LINEAR
+    
+    def _resolve_pixel_format(self) -> str:
+        """Pick the configured pixel format, or the best one this LiveKit SDK supports."""
+        for fmt in (self.pixel_format, *PIXEL_FORMAT_PREFERENCE):
+            if fmt in PIXEL_FORMAT_PREFERENCE and hasattr(rtc.VideoBufferType, fmt):
+                if fmt != self.pixel_format:
+                    logger.warning(f"Pixel format {self.pixel_format} not supported, using {fmt}")
+                return fmt
+        return "RGB24"
     
     def _connect(self, token: str):
         """Connect to LiveKit room."""
         if not LIVEKIT_AVAILABLE:
             return
         
+        # Invalidate any teardown still queued for the previous connection
+        with self._connection_lock:
+            self._connection_gen += 1
+        
         try:
             # Create room
             self._room = rtc.Room()
@@ -183,6 +318,23 @@ class StreamThread(threading.Thread):
             # Connect
             self._room.connect(self.livekit_url, token)
             
+            self._active_format = self._resolve_pixel_format()
+            self._buffer_type = getattr(rtc.VideoBufferType, self._active_format)
+            
+            # Preallocate the output buffer reused by every published frame
+            if self._active_format == "I420":
+                # Planar YUV 4:2:0 - what WebRTC encodes, so LiveKit skips its own RGB->YUV pass
+                shape = (self.frame_height * 3 // 2, self.frame_width)
+            else:
+                shape = (self.frame_height, self.frame_width, 3)
+            self._pixel_bytes = bytearray(int(np.prod(shape)))
+            self._pixel_buf = np.frombuffer(self._pixel_bytes, dtype=np.uint8).reshape(shape)
+            self._resize_buf = np.empty((self.frame_height, self.frame_width, 3), dtype=np.uint8)
+            
+            # Warm the JIT now so the first published frame doesn't pay for compilation
+            if self._active_format == "RGB24" and NUMBA_AVAILABLE:
+                self._bgr_to_rgb(self._resize_buf, self._pixel_buf)
+            
             # Create video source
             source = rtc.VideoSource(self.frame_width, self.frame_height)
             self._video_track = rtc.LocalVideoTrack.create_video_track(
@@ -212,32 +364,85 @@ class StreamThread(threading.Thread):
                 logger.error(f"Disconnect error: {e}")
             finally:
                 self._room = None
-                self._video_track = None
                 self.is_connected = False
+                # Free on the publish loop, after frames already queued there, so a
+                # frame being converted never has its buffers pulled out from under it
+                gen = self._connection_gen
+                self._call_on_publish_loop(lambda: self._release_publish_buffers(gen))
     
-    def _publish_frame(self, frame: np.ndarray):
-        """Publish frame to LiveKit."""
-        if not self._video_track:
+    def _release_publish_buffers(self, gen: int):
+        """Drop the video track and conversion buffers of connection gen (publish loop thread)."""
+        with self._connection_lock:
+            if gen != self._connection_gen:
+                return  # Reconnected meanwhile; the current state belongs to the new connection
+            self._video_track = None
+            self._pixel_bytes = None
+            self._pixel_buf = None
+            self._resize_buf = None
+    
+    def _call_on_publish_loop(self, fn, timeout: float = 5.0):
+        """Run fn on the publish loop thread and wait for it (directly if the loop is not running)."""
+        loop = self._publish_loop
+        if (
+            loop is None
+            or not loop.is_running()
+            or threading.current_thread() is self._publish_loop_thread
+        ):
+            fn()
             return
         
+        async def call():
+            fn()
+        
+        try:
+            asyncio.run_coroutine_threadsafe(call(), loop).result(timeout=timeout)
+        except Exception as e:
+            # Still queued behind a stuck frame; it runs (and frees, unless a
+            # reconnect happened first) once that returns
+            logger.warning(f"Publish loop busy, deferred stream teardown: {e!r}")
+    
+    def _publish_frame(self, frame: np.ndarray) -> bool:
+        """Publish frame to LiveKit. Returns True if the frame was captured."""
+        if not self._video_track:
+            return False
+        
         try:
-            # Convert BGR to RGB
-            import cv2
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # Fast path: CaptureThread frames already arrive C-contiguous at the
+            # published size and go straight to conversion. Otherwise normalize into
+            # the shared buffer (consumed immediately, so it can be reused).
+            height, width = frame.shape[:2]
+            if height != self.frame_height or width != self.frame_width:
+                frame = self._resize(
+                    frame, (self.frame_width, self.frame_height),
+                    dst=self._resize_buf,
+                    interpolation=self._interpolation_for(frame)
+                )
+            elif not frame.flags.c_contiguous:
+                # e.g. an ROI view - copy without allocating so conversion reads contiguous rows
+                np.copyto(self._resize_buf, frame)
+                frame = self._resize_buf
+            
+            # Convert BGR straight into the preallocated buffer (no allocation)
+            if self._active_format == "I420":
+                self._cvt_color(frame, cv2.COLOR_BGR2YUV_I420, dst=self._pixel_buf)
+            else:
+                self._bgr_to_rgb(frame, self._pixel_buf)
             
             # Create video frame
             video_frame = rtc.VideoFrame(
                 self.frame_width,
                 self.frame_height,
-                rtc.VideoBufferType.RGB24,
-                rgb_frame.tobytes()
+                self._buffer_type,
+                self._pixel_bytes
             )
             
             # Capture (publish)
             self._video_track.capture_frame(video_frame)
+            return True
             
         except Exception as e:
             logger.error(f"Failed to publish frame: {e}")
+            return False
     
     def get_status(self) -> dict:
         """Get streaming status."""
@@ -3,9 +3,18 @@ Sync Thread - Periodically syncs face database with backend.
 Handles offline resilience and log upload.
 """
 
+import base64
+import gzip
+import json
+import math
+import queue
+import random
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 from typing import Optional
 
@@ -13,10 +22,132 @@ import numpy as np
 
 from storage import FaceDatabase
 
+# Fast C JSON parser (optional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Binary sync payloads (optional) - embeddings arrive as raw float32 bytes
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# Incremental JSON parser (optional) - apply upserts while the body is still arriving
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
 
 logger = logging.getLogger(__name__)
 
 
+def _loads(content: bytes):
+    """Parse a JSON response body (orjson when available)."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _create_session() -> requests.Session:
+    """Create HTTP session with connection reuse and retry on transient errors."""
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[502, 503, 504],
+    )
+    # Four host pools, up to eight sockets each (sync, prefetch and uploads share it)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+
+# One connection pool for every backend call in the process; kept for the process
+# lifetime so pooled connections and TLS sessions stay warm across threads
+_SESSION = _create_session()
+
+
+def _parse_sync_response(response: requests.Response) -> dict:
+    """Parse a face-sync response body as msgpack or JSON, per its Content-Type."""
+    content_type = response.headers.get("Content-Type", "")
+    if MSGPACK_AVAILABLE and "msgpack" in content_type:
+        return msgpack.unpackb(response.content, raw=False)
+    return _loads(response.content)
+
+
+def _close_prefetched(future):
+    """Close the streamed response of a prefetched sync page that will not be read."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _dumps(obj) -> bytes:
+    """Serialize a request body to compact JSON bytes (orjson when available)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _decode_embedding(item: dict, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Decode a face embedding from a sync payload item.
+    
+    Prefers "embedding_b64" (base64 of little-endian float32 bytes), which
+    decodes straight into an ndarray without a Python float per dimension.
+    A msgpack payload may carry "embedding" as raw float32 bytes, which is
+    viewed directly. Falls back to the "embedding" list of floats.
+    
+    Backends that honour the "X-Embedding-Dtype: int8" request header send
+    "embedding_q8" (int8 values, base64 in JSON or raw bytes in msgpack) with
+    a float "embedding_scale" (see "API Integration" in README.md); it is
+    dequantized to float32 here, since the HNSW index only stores float32.
+    A scale that is not finite and positive raises ValueError.
+    
+    If out is given (a preallocated row), the embedding is written into it
+    without an intermediate per-face array; a length mismatch raises ValueError.
+    """
+    quantized = item.get("embedding_q8")
+    if quantized:
+        if isinstance(quantized, str):
+            quantized = base64.b64decode(quantized)
+        q8 = np.frombuffer(quantized, dtype=np.int8)
+        scale = float(item["embedding_scale"])
+        if not (math.isfinite(scale) and scale > 0):
+            raise ValueError(f"invalid embedding_scale {scale!r}")
+        if out is None:
+            return q8 * np.float32(scale)
+        if len(q8) != len(out):
+            raise ValueError(f"embedding dimension {len(q8)} != {len(out)}")
+        np.multiply(q8, np.float32(scale), out=out)
+        return out
+    
+    packed = item.get("embedding_b64")
+    if packed:
+        embedding = np.frombuffer(base64.b64decode(packed), dtype="<f4")
+    else:
+        embedding = item["embedding"]
+        if isinstance(embedding, (bytes, bytearray, memoryview)):
+            embedding = np.frombuffer(embedding, dtype="<f4")
+    
+    if out is None:
+        return np.asarray(embedding, dtype=np.float32)
+    if len(embedding) != len(out):
+        raise ValueError(f"embedding dimension {len(embedding)} != {len(out)}")
+    out[:] = embedding
+    return out
+
+
 class SyncThread(threading.Thread):
     """
     Background thread for syncing with backend.
@@ -27,6 +158,13 @@ class SyncThread(threading.Thread):
     - Handle network failures gracefully
     """
     
+    # Upserts applied per bulk insert while stream-parsing a JSON sync page
+    STREAM_CHUNK_SIZE = 256
+    # Smaller log uploads are sent uncompressed (gzip overhead outweighs the saving)
+    GZIP_MIN_LOGS = 4
+    # Retry delay after consecutive failed syncs: 2, 4, 8, ... seconds (+ jitter), capped
+    MAX_BACKOFF_SECONDS = 300
+    
     def __init__(
         self,
         face_db: FaceDatabase,
@@ -34,6 +172,7 @@ class SyncThread(threading.Thread):
         org_id: str,
         interval_seconds: float = 10,
         version_file: str = "data/sync_version.txt",
+        page_size: int = 1000,
     ):
         super().__init__(name="SyncThread", daemon=True)
         
@@ -42,9 +181,22 @@ class SyncThread(threading.Thread):
         self.org_id = org_id
         self.sync_interval = interval_seconds
         self.version_file = version_file
+        self.page_size = page_size
         
         self._stop_event = threading.Event()
-        self._last_face_sync = 0.0
+        self._wake_event = threading.Event()  # Set by force_sync()/stop() to end the wait early
+        self._next_face_sync = 0.0  # time.monotonic() when the next sync is due
+        self._fail_count = 0  # Consecutive failed syncs (drives retry backoff)
+        self._etag: Optional[str] = None  # ETag of the last applied sync response
+        self._etag_version: Optional[str] = None  # DB version that ETag was received for
+        self._cursor_supported = False  # Backend has returned a next_cursor (send 'limit')
+        
+        # Process-wide keep-alive session (no TCP+TLS handshake per sync)
+        self._session = _SESSION
+        # Fetches the next sync page while the current one is decoded and inserted
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SyncPrefetch")
+        # Reads + stream-parses a page body while the sync thread inserts parsed chunks
+        self._parse_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SyncParse")
         
         # Stats
         self.last_sync_success = False
@@ -65,24 +217,29 @@ class SyncThread(threading.Thread):
         self._sync_faces()
         
         while not self._stop_event.is_set():
-            now = time.time()
+            # Sleep exactly until the next sync is due (or until woken)
+            remaining = self._next_face_sync - time.monotonic()
+            if remaining > 0:
+                self._wake_event.wait(timeout=remaining)
+            self._wake_event.clear()
             
-            # Check if face sync needed
-            if now - self._last_face_sync >= self.sync_interval:
-                self._sync_faces()
+            if self._stop_event.is_set():
+                break
             
-            # Sleep briefly
-            self._stop_event.wait(timeout=5.0)
+            self._sync_faces()
         
+        self._prefetch_executor.shutdown(wait=False)
+        self._parse_executor.shutdown(wait=False)
         logger.info("Sync thread stopped")
     
     def stop(self):
         """Signal thread to stop."""
         self._stop_event.set()
+        self._wake_event.set()
     
     def _sync_faces(self):
         """Sync faces from backend."""
-        self._last_face_sync = time.time()
+        self._next_face_sync = time.monotonic() + self.sync_interval
         
         try:
             current_version = self.face_db.get_version()
@@ -96,81 +253,290 @@ class SyncThread(threading.Thread):
             if current_version and current_version != "0":
                 params["since"] = current_version
             
+            # Paged: only once the backend has shown it pages (sent a next_cursor).
+            # A backend that honoured 'limit' without cursors would truncate the
+            # delta, and the version would then move past the faces never sent.
+            if self._cursor_supported:
+                params["limit"] = self.page_size
+            
+            # Ask for int8 + per-vector scale embeddings (4x fewer bytes); backends
+            # that don't support it ignore the header and send float32
+            headers = {"X-Embedding-Dtype": "int8"}
+            if MSGPACK_AVAILABLE:
+                headers["Accept"] = "application/x-msgpack, application/json;q=0.9"
+            
+            # Conditional request: the backend answers 304 with no body if nothing changed.
+            # Only valid while the local DB is still at the version the ETag was issued for.
+            first_headers = dict(headers)
+            if self._etag and self._etag_version == current_version:
+                first_headers["If-None-Match"] = self._etag
+            
             logger.info(f"Syncing faces from {url} (current version: {current_version})")
             
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
+            response = self._session.get(
+                url, params=params, headers=first_headers, timeout=30, stream=True
+            )
             
-            data = response.json()
+            if response.status_code == 304:
+                response.close()
+                logger.info("No updates from backend (304 Not Modified)")
+                self.last_sync_success = True
+                self.last_sync_time = time.time()
+                self.sync_error = None
+                self._fail_count = 0
+                return
             
-            # Debug: log raw response structure
-            logger.debug(f"Sync response keys: {data.keys()}")
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
             
-            # API returns: { version, upserts, deletes, count }
-            upserts = data.get("upserts", [])
-            deletes = data.get("deletes", [])
-            new_version = data.get("version", current_version)
+            # API returns: { version, upserts, deletes, count[, next_cursor] } per page
+            new_version = current_version
+            total_upserts = total_deletes = added_count = 0
+            page = 0
+            # Overlap the next page's network round trip with this page's CPU work:
+            # the prefetch starts as soon as the page's next_cursor has been parsed
+            next_page = []  # At most one prefetched, not yet consumed page future
+            prefetch_lock = threading.Lock()
+            prefetch_closed = False
             
-            logger.info(f"API returned: {len(upserts)} upserts, {len(deletes)} deletes, version: {new_version}")
+            def prefetch(cursor):
+                # May run on the SyncParse worker, even after this sync has failed
+                with prefetch_lock:
+                    if prefetch_closed:
+                        return
+                    self._cursor_supported = True
+                    next_page.append(self._prefetch_executor.submit(
+                        self._fetch_sync_page, url, {**params, "cursor": cursor}, headers
+                    ))
             
-            if upserts or deletes:
-                # Debug: verify embedding format
-                if upserts:
-                    first_emb = upserts[0].get("embedding", [])
-                    logger.debug(f"First embedding type: {type(first_emb)}, len: {len(first_emb) if first_emb else 0}")
-                    if first_emb:
-                        logger.debug(f"First embedding sample: {first_emb[:3]}... (first 3 values)")
-                
-                # Handle deletes first
-                for face_id in deletes:
-                    self.face_db.remove_face(face_id)
-                
-                # Handle upserts - add/update each face individually (delta sync)
-                # Don't use sync_from_backend() as that clears all data (full sync only)
-                added_count = 0
-                for item in upserts:
-                    try:
-                        embedding = np.array(item["embedding"], dtype=np.float32)
-                        success = self.face_db.add_face(
-                            face_id=item["id"],
-                            user_id=item.get("person_id"),
-                            name=item["full_name"],
-                            status=item["status"],
-                            embedding=embedding
-                        )
-                        if success:
-                            added_count += 1
-                    except Exception as e:
-                        logger.error(f"Failed to add face {item.get('id')}: {e}")
-                
-                logger.info(f"Added/updated {added_count}/{len(upserts)} faces")
-                
-                # Save to disk after batch add
-                self.face_db.save()
+            try:
+                while response is not None:
+                    page += 1
+                    
+                    with response:
+                        version, n_upserts, n_deletes, added = self._consume_sync_page(response, prefetch)
+                    
+                    new_version = version or new_version
+                    logger.info(f"API page {page}: {n_upserts} upserts, {n_deletes} deletes, version: {new_version}")
+                    
+                    total_upserts += n_upserts
+                    total_deletes += n_deletes
+                    added_count += added
+                    with prefetch_lock:
+                        future = next_page.pop() if next_page else None
+                    response = future.result() if future is not None else None
+            finally:
+                # A failed page leaves its prefetch in flight: cancel it or close its
+                # streamed response so the pooled connection is released
+                with prefetch_lock:
+                    prefetch_closed = True
+                    pending = list(next_page)
+                for future in pending:
+                    if not future.cancel():
+                        future.add_done_callback(_close_prefetched)
+            
+            if total_upserts or total_deletes:
+                logger.info(f"Added/updated {added_count}/{total_upserts} faces")
                 
-                # Update version (this also saves to disk)
+                # Update version (single save of index, metadata and version)
                 self.face_db.set_version(new_version)
                 
                 # Print final count
                 final_count = self.face_db.count()
-                logger.info(f"[SYNC OK] {len(upserts)} upserts, {len(deletes)} deletes -> {final_count} faces in DB, version {new_version}")
-                print(f"[SYNC OK] {len(upserts)} upserts, {len(deletes)} deletes -> {final_count} faces in DB, version {new_version}")
+                logger.info(f"[SYNC OK] {total_upserts} upserts, {total_deletes} deletes -> {final_count} faces in DB, version {new_version}")
+                print(f"[SYNC OK] {total_upserts} upserts, {total_deletes} deletes -> {final_count} faces in DB, version {new_version}")
             else:
                 logger.info("No updates from backend (database up to date)")
             
+            self._etag = etag
+            self._etag_version = self.face_db.get_version()
+            
             self.last_sync_success = True
             self.last_sync_time = time.time()
             self.sync_error = None
+            self._fail_count = 0
             
         except requests.exceptions.RequestException as e:
             logger.warning(f"Face sync failed (network): {e}")
             self.last_sync_success = False
             self.sync_error = str(e)
+            self._schedule_retry()
             
         except Exception as e:
             logger.error(f"Face sync failed: {e}")
             self.last_sync_success = False
             self.sync_error = str(e)
+            self._schedule_retry()
+    
+    def _schedule_retry(self):
+        """Schedule the next sync attempt with exponential backoff plus jitter after a failure."""
+        self._fail_count += 1
+        delay = min(self.MAX_BACKOFF_SECONDS, 2 ** self._fail_count) + random.random() * 2
+        self._next_face_sync = time.monotonic() + delay
+        logger.info(f"Retrying face sync in {delay:.1f}s (failure #{self._fail_count})")
+    
+    def _fetch_sync_page(self, url: str, params: dict, headers: dict) -> requests.Response:
+        """Request one follow-up page of a paged face sync (body left unread)."""
+        response = self._session.get(url, params=params, headers=headers, timeout=30, stream=True)
+        response.raise_for_status()
+        return response
+    
+    def _consume_sync_page(self, response: requests.Response, on_next_cursor) -> tuple:
+        """
+        Parse and apply one sync page.
+        
+        Returns:
+            (version, upsert count, delete count, faces added/updated)
+        """
+        if IJSON_AVAILABLE and "msgpack" not in response.headers.get("Content-Type", ""):
+            return self._stream_sync_page(response, on_next_cursor)
+        
+        data = _parse_sync_response(response)
+        
+        # Debug: log raw response structure
+        logger.debug(f"Sync response keys: {data.keys()}")
+        
+        upserts = data.get("upserts", [])
+        deletes = data.get("deletes", [])
+        if data.get("next_cursor"):
+            on_next_cursor(data["next_cursor"])
+        
+        added = 0
+        if upserts or deletes:
+            # Debug: verify embedding format
+            if upserts and logger.isEnabledFor(logging.DEBUG):
+                first_emb = _decode_embedding(upserts[0])
+                logger.debug(f"First embedding len: {len(first_emb)}, sample: {first_emb[:3]}... (first 3 values)")
+            
+            # Each page is applied atomically with respect to searches; nothing
+            # is persisted until the version is set after the last page
+            with self.face_db.batch():
+                added = self._apply_sync_page(upserts, deletes)
+        
+        return data.get("version"), len(upserts), len(deletes), added
+    
+    def _stream_sync_page(self, response: requests.Response, on_next_cursor) -> tuple:
+        """
+        Stream-parse a JSON sync page, bulk-inserting upserts in chunks as they arrive.
+        
+        Two-stage pipeline: a SyncParse worker reads and parses the body
+        (socket reads and the C parser release the GIL) and hands chunks of
+        upserts over a small bounded queue; this thread decodes and inserts
+        them (hnswlib releases the GIL too), so network, parse and insert overlap.
+        
+        Only a few chunks of upsert dicts are alive at a time instead of the
+        whole page. Deletes are applied at the end, skipping ids upserted in
+        the same page, so a face listed in both stays present as in the
+        buffered path.
+        """
+        chunks: queue.Queue = queue.Queue(maxsize=2)
+        cancelled = threading.Event()
+        producer = self._parse_executor.submit(
+            self._parse_sync_stream, response, on_next_cursor, chunks, cancelled
+        )
+        
+        upserted_ids = set()
+        n_upserts = added = 0
+        try:
+            for chunk in iter(chunks.get, None):
+                added += self._apply_sync_page(chunk, [])
+                upserted_ids.update(item.get("id") for item in chunk)
+                n_upserts += len(chunk)
+        finally:
+            cancelled.set()  # Unblocks and stops the parser if inserting failed
+        
+        version, deletes = producer.result()  # Re-raises parse/network errors
+        
+        if deletes:
+            self.face_db.remove_faces_bulk([d for d in deletes if d not in upserted_ids])
+        
+        return version, n_upserts, len(deletes), added
+    
+    def _parse_sync_stream(
+        self,
+        response: requests.Response,
+        on_next_cursor,
+        chunks: queue.Queue,
+        cancelled: threading.Event
+    ) -> tuple:
+        """
+        Parser stage of _stream_sync_page (runs on the SyncParse worker).
+        
+        Puts lists of up to STREAM_CHUNK_SIZE upserts on chunks, then None.
+        
+        Returns:
+            (version, deletes)
+        """
+        def emit(item):
+            while not cancelled.is_set():
+                try:
+                    chunks.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+        
+        response.raw.decode_content = True  # Undo gzip transfer encoding
+        
+        version = None
+        deletes = []
+        chunk = []
+        try:
+            events = ijson.parse(response.raw, use_float=True)
+            for prefix, event, value in events:
+                if cancelled.is_set():
+                    break
+                if prefix == "upserts.item" and event == "start_map":
+                    # Build one upsert object from its events
+                    builder = ObjectBuilder()
+                    builder.event(event, value)
+                    for prefix, event, value in events:
+                        builder.event(event, value)
+                        if prefix == "upserts.item" and event == "end_map":
+                            break
+                    chunk.append(builder.value)
+                    
+                    if len(chunk) >= self.STREAM_CHUNK_SIZE:
+                        emit(chunk)
+                        chunk = []
+                elif prefix == "deletes.item":
+                    deletes.append(value)
+                elif prefix == "version" and event in ("string", "number"):
+                    version = value
+                elif prefix == "next_cursor" and event == "string" and value:
+                    on_next_cursor(value)
+            
+            if chunk:
+                emit(chunk)
+        finally:
+            emit(None)
+        
+        return version, deletes
+    
+    def _apply_sync_page(self, upserts: list, deletes: list) -> int:
+        """Apply one page of deletes and upserts. Returns faces added/updated."""
+        # Handle deletes first
+        self.face_db.remove_faces_bulk(deletes)
+        
+        # Handle upserts - add/update in one bulk call (delta sync)
+        # Don't use sync_from_backend() as that clears all data (full sync only)
+        # Rows are filled in place; a failed item's row is reused by the next one
+        embeddings = np.empty((len(upserts), self.face_db.dim), dtype=np.float32)
+        ids, user_ids, names, statuses = [], [], [], []
+        for item in upserts:
+            try:
+                _decode_embedding(item, out=embeddings[len(ids)])
+                face_id, name, status = item["id"], item["full_name"], item["status"]
+            except Exception as e:
+                logger.error(f"Failed to add face {item.get('id')}: {e}")
+                continue
+            ids.append(face_id)
+            user_ids.append(item.get("person_id"))
+            names.append(name)
+            statuses.append(status)
+        
+        if not ids:
+            return 0
+        return self.face_db.add_faces_bulk(ids, user_ids, names, statuses, embeddings[:len(ids)])
     
     def _upload_logs(self):
         """Upload unsynced access logs to backend."""
@@ -200,9 +566,18 @@ class SyncThread(threading.Thread):
                     "face_crop_b64": event.face_crop_b64
                 })
             
-            response = requests.post(
+            body = _dumps({"logs": logs})
+            headers = {"Content-Type": "application/json"}
+            if len(logs) >= self.GZIP_MIN_LOGS:
+                # Level 1 gzip: ~4x faster than the default and still shrinks the
+                # JSON + base64 crop payload substantially on the gate's uplink
+                body = gzip.compress(body, compresslevel=1)
+                headers["Content-Encoding"] = "gzip"
+            
+            response = self._session.post(
                 url,
-                json={"logs": logs},
+                data=body,
+                headers=headers,
                 timeout=30
             )
             response.raise_for_status()
@@ -221,7 +596,7 @@ class SyncThread(threading.Thread):
     
     def force_sync(self):
         """Force immediate face sync."""
-        self._last_face_sync = 0  # Reset timer
+        self._wake_event.set()
         logger.info("Force sync triggered")
     
     def get_status(self) -> dict:
@@ -131,6 +131,8 @@ class UIThread(threading.Thread):
     
     # Alert layout constants
     MAX_ALERTS = 4              # Max alerts to display at once
+    STATUS_BAR_HEIGHT = 35
+    SPRITE_CACHE_MAX = 64       # Pre-rendered static layers kept before the cache is reset
     ALERT_DURATION_WANTED = 60.0  # seconds
     ALERT_DURATION_UNKNOWN = 60.0  # seconds
     
@@ -143,6 +145,7 @@ class UIThread(threading.Thread):
         fullscreen: bool = False,
         capture_thread = None,    # For streaming mode
         alarm_enabled: bool = True,
+        opengl: bool = False,     # GPU-composited window (falls back if OpenCV lacks OpenGL)
     ):
         super().__init__(name="UIThread", daemon=True)
         
@@ -153,6 +156,7 @@ class UIThread(threading.Thread):
         self.fullscreen = fullscreen
         self.capture_thread = capture_thread
         self.alarm_enabled = alarm_enabled
+        self.opengl = opengl
         
         # Alert management - multiple concurrent alerts
         self._active_alerts: Dict[int, AlertInfo] = {}  # track_id -> AlertInfo
@@ -176,6 +180,12 @@ class UIThread(threading.Thread):
         self._cached_overlays: List[FaceOverlay] = []
         self._cached_overlay_time: float = 0.0
         
+        # Pre-rendered static layers (idle screen, status bar background + fixed
+        # labels), keyed by everything they depend on; blitted instead of re-rastered
+        self._sprite_cache: Dict[tuple, np.ndarray] = {}
+        # Formatted clock and the wall-clock second it was formatted for
+        self._time_str_cache = ("", -1)
+        
         # Stats
         self.fps = 0.0
         self._frame_count = 0
@@ -201,11 +211,10 @@ class UIThread(threading.Thread):
             return
         
         try:
+            self._create_window(cv)
             if self.fullscreen:
-                cv.namedWindow(self.window_name, cv.WINDOW_NORMAL)
                 cv.setWindowProperty(self.window_name, cv.WND_PROP_FULLSCREEN, cv.WINDOW_FULLSCREEN)
             else:
-                cv.namedWindow(self.window_name, cv.WINDOW_NORMAL)
                 cv.resizeWindow(self.window_name, self.display_width, self.display_height)
             self._gui_available = True
             logger.info(f"Display window created: {self.display_width}x{self.display_height}")
@@ -218,6 +227,23 @@ class UIThread(threading.Thread):
         cv.destroyAllWindows()
         logger.info("UI thread stopped")
     
+    def _create_window(self, cv):
+        """
+        Create the display window.
+        
+        With opengl enabled, imshow uploads frames to a GL texture and the GPU
+        scales/composites them, instead of the CPU blit through the window
+        system. Needs an OpenCV build with OpenGL; otherwise falls back.
+        """
+        if self.opengl:
+            try:
+                cv.namedWindow(self.window_name, cv.WINDOW_NORMAL | cv.WINDOW_OPENGL)
+                logger.info("Display window using OpenGL")
+                return
+            except cv.error as e:
+                logger.warning(f"OpenGL window unavailable ({e}). Using standard window.")
+        cv.namedWindow(self.window_name, cv.WINDOW_NORMAL)
+    
     def _run_headless(self):
         """Headless mode: process alerts without rendering."""
         while not self._stop_event.is_set():
@@ -229,22 +255,29 @@ class UIThread(threading.Thread):
         """Main rendering loop."""
         target_fps = 30
         frame_interval = 1.0 / target_fps
-        last_frame_time = time.time()
+        last_idle_key = None
         
         while not self._stop_event.is_set():
+            frame_start = time.monotonic()
+            
             # Cleanup expired alerts
             self._cleanup_expired_alerts()
             
-            # Render based on mode
-            if self.mode == DisplayMode.STREAMING:
-                canvas = self._render_streaming_mode()
-            elif self.mode == DisplayMode.CONTINUOUS:
-                canvas = self._render_continuous_mode()
-            else:  # ALERT_ONLY
-                canvas = self._render_alert_mode()
-            
-            # Display
-            cv.imshow(self.window_name, canvas)
+            # The idle screen is static until its status, FPS or clock text changes:
+            # skip re-rendering and re-uploading it (the window keeps the last image)
+            idle_key = self._idle_state_key() if self.mode == DisplayMode.ALERT_ONLY else None
+            if idle_key is None or idle_key != last_idle_key:
+                # Render based on mode
+                if self.mode == DisplayMode.STREAMING:
+                    canvas = self._render_streaming_mode()
+                elif self.mode == DisplayMode.CONTINUOUS:
+                    canvas = self._render_continuous_mode()
+                else:  # ALERT_ONLY
+                    canvas = self._render_alert_mode()
+                
+                # Display
+                cv.imshow(self.window_name, canvas)
+            last_idle_key = idle_key
             self._frame_count += 1
             
             # Update FPS
@@ -254,8 +287,11 @@ class UIThread(threading.Thread):
                 self._frame_count = 0
                 self._fps_start_time = now
             
-            # Handle keyboard
-            key = cv.waitKey(1) & 0xFF
+            # Frame rate limiting + keyboard: waitKey blocks on GUI events for the rest
+            # of the frame budget, so there is one wait per frame instead of two
+            elapsed = time.monotonic() - frame_start
+            wait_ms = max(1, int((frame_interval - elapsed) * 1000))
+            key = cv.waitKey(wait_ms) & 0xFF
             if key == ord('q'):
                 self._stop_event.set()
             elif key == ord('m'):
@@ -264,12 +300,17 @@ class UIThread(threading.Thread):
                 self.fullscreen = not self.fullscreen
                 prop = cv.WINDOW_FULLSCREEN if self.fullscreen else cv.WINDOW_NORMAL
                 cv.setWindowProperty(self.window_name, cv.WND_PROP_FULLSCREEN, prop)
-            
-            # Frame rate limiting
-            elapsed = time.time() - last_frame_time
-            if elapsed < frame_interval:
-                time.sleep(frame_interval - elapsed)
-            last_frame_time = time.time()
+    
+    def _idle_state_key(self) -> Optional[tuple]:
+        """Everything drawn on the idle screen, or None while alerts are showing."""
+        with self._alert_lock:
+            if self._active_alerts:
+                return None
+        with self._status_lock:
+            status = self._system_status
+            state = (status.gate_state, status.face_db_count, status.sync_status)
+        # Status bar shows FPS rounded and a HH:MM:SS clock
+        return (self.mode, state, round(self.fps), int(time.time()))
     
     def _cleanup_expired_alerts(self):
         """Remove expired alerts."""
@@ -315,29 +356,37 @@ class UIThread(threading.Thread):
     
     def _render_idle_screen(self, canvas: np.ndarray) -> np.ndarray:
         """Render idle/dashboard screen."""
-        title = "GATE ACCESS CONTROL"
-        self._draw_centered_text(canvas, title, self.display_height // 3,
-                                  font_scale=2.0, thickness=3)
-        
         with self._status_lock:
             gate_state = self._system_status.gate_state
             db_count = self._system_status.face_db_count
             sync_status = self._system_status.sync_status
         
-        gate_color = self.COLORS['authorized'] if gate_state == "OPEN" else self.COLORS['unknown']
-        self._draw_centered_text(canvas, f"Gate: {gate_state}", self.display_height // 2,
-                                  font_scale=1.2, thickness=2, color=gate_color)
-        
-        info_y = int(self.display_height * 0.65)
-        self._draw_centered_text(canvas, f"Enrolled Faces: {db_count}", info_y,
-                                  font_scale=0.8, color=self.COLORS['text_secondary'])
-        self._draw_centered_text(canvas, f"Sync: {sync_status}", info_y + 35,
-                                  font_scale=0.7, color=self.COLORS['text_muted'])
-        
-        mode_text = f"Mode: {self.mode.value.upper()} | [M] Switch | [F] Fullscreen | [Q] Quit"
-        self._draw_centered_text(canvas, mode_text, self.display_height - 70,
-                                  font_scale=0.5, color=self.COLORS['text_muted'])
+        # The idle screen only changes with status/mode, so it is rendered once per state
+        key = ("idle", canvas.shape, gate_state, db_count, sync_status, self.mode)
+        sprite = self._sprite_cache.get(key)
+        if sprite is None:
+            sprite = np.full(canvas.shape, self.COLORS['bg_dark'], dtype=np.uint8)
+            
+            title = "GATE ACCESS CONTROL"
+            self._draw_centered_text(sprite, title, self.display_height // 3,
+                                      font_scale=2.0, thickness=3)
+            
+            gate_color = self.COLORS['authorized'] if gate_state == "OPEN" else self.COLORS['unknown']
+            self._draw_centered_text(sprite, f"Gate: {gate_state}", self.display_height // 2,
+                                      font_scale=1.2, thickness=2, color=gate_color)
+            
+            info_y = int(self.display_height * 0.65)
+            self._draw_centered_text(sprite, f"Enrolled Faces: {db_count}", info_y,
+                                      font_scale=0.8, color=self.COLORS['text_secondary'])
+            self._draw_centered_text(sprite, f"Sync: {sync_status}", info_y + 35,
+                                      font_scale=0.7, color=self.COLORS['text_muted'])
+            
+            mode_text = f"Mode: {self.mode.value.upper()} | [M] Switch | [F] Fullscreen | [Q] Quit"
+            self._draw_centered_text(sprite, mode_text, self.display_height - 70,
+                                      font_scale=0.5, color=self.COLORS['text_muted'])
+            self._cache_sprite(key, sprite)
         
+        np.copyto(canvas, sprite)
         self._draw_status_bar(canvas)
         return canvas
     
@@ -528,15 +577,20 @@ class UIThread(threading.Thread):
             # Also cache the AI frame for fallback
             self._cached_ai_frame = latest_data.frame
         
-        # Get smooth frame from capture thread (primary video source)
+        # Get smooth frame from capture thread (primary video source).
+        # Stream-queue frames are private copies handed to exactly one consumer,
+        # so they can be drawn on in place.
         frame = None
+        owned = True
         if self.capture_thread is not None:
             frame = self.capture_thread.get_stream_frame(timeout=0.01)
         
         if frame is None:
-            # Fallback to AI frame if capture thread not available
+            # Fallback to AI frame if capture thread not available (shared
+            # read-only with the pipeline and reused across renders)
             if hasattr(self, '_cached_ai_frame') and self._cached_ai_frame is not None:
-                frame = self._cached_ai_frame.copy()
+                frame = self._cached_ai_frame
+                owned = False
             elif self._last_continuous_frame is not None:
                 return self._last_continuous_frame
             else:
@@ -551,7 +605,8 @@ class UIThread(threading.Thread):
             scale_y = self.display_height / frame.shape[0]
             frame = cv2.resize(frame, (self.display_width, self.display_height))
         else:
-            frame = frame.copy()
+            if not owned:
+                frame = frame.copy()
             scale_x = scale_y = 1.0
         
         # Draw face overlays (from cached AI results)
@@ -607,17 +662,15 @@ class UIThread(threading.Thread):
             self._draw_status_bar(canvas)
             return canvas
         
-        # Resize to display size (no processing, just resize)
+        # Resize to display size (no processing, just resize). The stream-queue frame
+        # is already a private copy, so same-size frames are drawn on in place.
         if frame.shape[1] != self.display_width or frame.shape[0] != self.display_height:
             frame = cv2.resize(frame, (self.display_width, self.display_height))
-        else:
-            frame = frame.copy()
         
         # Minimal overlay - just mode indicator and time
         cv2.putText(frame, "STREAMING", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 
                     0.7, (0, 255, 0), 2)
-        time_str = datetime.now().strftime("%H:%M:%S")
-        cv2.putText(frame, time_str, (self.display_width - 100, 30),
+        cv2.putText(frame, self._time_str(), (self.display_width - 100, 30),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
         
         # Cache this frame
@@ -673,25 +726,17 @@ class UIThread(threading.Thread):
     
     def _draw_status_bar(self, canvas: np.ndarray):
         """Draw status bar at bottom."""
-        bar_height = 35
-        bar_y = canvas.shape[0] - bar_height
-        
-        cv2.rectangle(canvas, (0, bar_y), (canvas.shape[1], canvas.shape[0]),
-                      self.COLORS['bg_panel'], -1)
+        bar_y = canvas.shape[0] - self.STATUS_BAR_HEIGHT
         
         with self._status_lock:
             gate_state = self._system_status.gate_state
         
-        gate_color = self.COLORS['authorized'] if gate_state == "OPEN" else self.COLORS['unknown']
-        cv2.putText(canvas, f"Gate: {gate_state}", (15, bar_y + 24),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, gate_color, 2)
+        # Background and fixed labels come from a cached strip; only live values are drawn
+        canvas[bar_y:] = self._get_status_bar_sprite(canvas.shape[1], gate_state)
         
         cv2.putText(canvas, f"FPS: {self.fps:.0f}", (180, bar_y + 24),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.55, self.COLORS['text_muted'], 1)
         
-        cv2.putText(canvas, f"Mode: {self.mode.value}", (300, bar_y + 24),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.55, self.COLORS['text_muted'], 1)
-        
         # Alert count
         with self._alert_lock:
             alert_count = len(self._active_alerts)
@@ -699,10 +744,37 @@ class UIThread(threading.Thread):
             cv2.putText(canvas, f"Alerts: {alert_count}", (450, bar_y + 24),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.55, self.COLORS['wanted'], 1)
         
-        time_str = datetime.now().strftime("%H:%M:%S")
-        cv2.putText(canvas, time_str, (canvas.shape[1] - 100, bar_y + 24),
+        cv2.putText(canvas, self._time_str(), (canvas.shape[1] - 100, bar_y + 24),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, self.COLORS['text_secondary'], 1)
     
+    def _time_str(self) -> str:
+        """Current time as HH:MM:SS, formatted at most once per second."""
+        sec = int(time.time())
+        if sec != self._time_str_cache[1]:
+            self._time_str_cache = (datetime.fromtimestamp(sec).strftime("%H:%M:%S"), sec)
+        return self._time_str_cache[0]
+    
+    def _get_status_bar_sprite(self, width: int, gate_state: str) -> np.ndarray:
+        """Status bar background with gate state and mode labels, rendered once per state."""
+        key = ("status_bar", width, gate_state, self.mode)
+        sprite = self._sprite_cache.get(key)
+        if sprite is None:
+            sprite = np.full((self.STATUS_BAR_HEIGHT, width, 3), self.COLORS['bg_panel'], dtype=np.uint8)
+            
+            gate_color = self.COLORS['authorized'] if gate_state == "OPEN" else self.COLORS['unknown']
+            cv2.putText(sprite, f"Gate: {gate_state}", (15, 24),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, gate_color, 2)
+            cv2.putText(sprite, f"Mode: {self.mode.value}", (300, 24),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.55, self.COLORS['text_muted'], 1)
+            self._cache_sprite(key, sprite)
+        return sprite
+    
+    def _cache_sprite(self, key: tuple, sprite: np.ndarray):
+        """Store a pre-rendered layer, resetting the cache if it has grown stale."""
+        if len(self._sprite_cache) >= self.SPRITE_CACHE_MAX:
+            self._sprite_cache.clear()
+        self._sprite_cache[key] = sprite
+    
     def _draw_centered_text(self, canvas: np.ndarray, text: str, y: int,
                             font_scale: float = 1.0, thickness: int = 2,
                             color: tuple = None):
@@ -832,7 +904,9 @@ class UIThread(threading.Thread):
         """
         Put a UIFrame on the display queue.
         
-        Handles alert extraction and frame queuing.
+        Handles alert extraction and frame queuing. ui_frame.frame is kept by
+        reference, not copied: the producer must not modify it afterwards
+        (the detection loop marks it read-only before handing it over).
         """
         # Check for alerts
         for face in ui_frame.faces:
@@ -886,4 +960,5 @@ def create_ui_thread_from_config(config) -> UIThread:
         mode=getattr(config, 'DISPLAY_MODE', 'alert_only'),
         fullscreen=getattr(config, 'DISPLAY_FULLSCREEN', False),
         alarm_enabled=getattr(config, 'ALARM_ENABLED', True),
+        opengl=getattr(config, 'DISPLAY_OPENGL', False),
     )
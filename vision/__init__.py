@@ -3,7 +3,7 @@
 from .detector import SCRFDDetector
 from .recognizer import ArcFaceRecognizer
 from .tracker import SimpleTracker, DeepSORTLiteTracker, Track, TrackPhase, TrackerStatistics
-from .alignment import align_face, align_face_from_bbox
+from .alignment import align_face, align_face_from_bbox, batch_align_faces
 from .quality import (
     assess_face_quality,
     filter_quality_detections,
@@ -22,6 +22,7 @@ __all__ = [
     "TrackerStatistics",
     "align_face",
     "align_face_from_bbox",
+    "batch_align_faces",
     "assess_face_quality",
     "filter_quality_detections",
     "QualityResult",
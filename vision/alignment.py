@@ -5,7 +5,13 @@ Aligns detected faces to a standard 112x112 template using 5-point landmarks.
 
 import numpy as np
 import cv2
-from typing import Optional
+from typing import List, Optional
+
+# OpenCV CUDA modules (optional) - GPU warp for batch alignment
+try:
+    CUDA_AVAILABLE = cv2.cuda.getCudaEnabledDeviceCount() > 0
+except (AttributeError, cv2.error):
+    CUDA_AVAILABLE = False
 
 
 # Standard ArcFace template landmarks (112x112) - reference points
@@ -21,8 +27,16 @@ ARC_TEMPLATE = np.array(
     dtype=np.float32,
 )
 
+# Template statistics, fixed for every fit against ARC_TEMPLATE
+_DST_MEAN = ARC_TEMPLATE.mean(axis=0)
+_DST_DEMEAN = ARC_TEMPLATE - _DST_MEAN
+
 TARGET_SIZE = (112, 112)
 
+# Transforms within this of identity are treated as identity (a plain crop)
+_IDENTITY = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], dtype=np.float32)
+IDENTITY_TOLERANCE = 1e-3
+
 
 def estimate_similarity_transform(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
     """
@@ -39,37 +53,90 @@ def estimate_similarity_transform(src: np.ndarray, dst: np.ndarray) -> np.ndarra
     num = src.shape[0]
     
     src_mean = src.mean(axis=0)
-    dst_mean = dst.mean(axis=0)
     src_demean = src - src_mean
-    dst_demean = dst - dst_mean
+    if dst is ARC_TEMPLATE:
+        dst_mean, dst_demean = _DST_MEAN, _DST_DEMEAN
+    else:
+        dst_mean = dst.mean(axis=0)
+        dst_demean = dst - dst_mean
     
     # Covariance matrix: dst^T @ src (NOT src^T @ dst!)
-    A = (dst_demean.T @ src_demean) / num
+    (a, b), (c, d) = (dst_demean.T @ src_demean) / num
     
-    # SVD
-    U, S, Vt = np.linalg.svd(A)
+    # Closed form of the 2x2 SVD step (no LAPACK call). With the reflection
+    # correction, sum(S * diag(D)) is always 2*sqrt(E^2 + H^2) and R is the
+    # rotation by atan2(H, E), where E = (a + d) / 2 and H = (c - b) / 2. So
+    # scale * R = [[p, -q], [q, p]] with p = 2E / src_var and q = 2H / src_var.
+    src_var = (src_demean ** 2).sum() / num
+    p = (a + d) / src_var
+    q = (c - b) / src_var
     
-    # Handle reflection
-    d = np.linalg.det(U @ Vt)
-    D = np.diag([1.0, 1.0 if d >= 0 else -1.0])
+    # Translation: t = dst_mean - scale * (R @ src_mean)
+    sx, sy = src_mean
     
-    # Rotation
-    R = U @ D @ Vt
+    # Build 2x3 matrix
+    M = np.empty((2, 3), dtype=np.float32)
+    M[0, 0] = p
+    M[0, 1] = -q
+    M[1, 0] = q
+    M[1, 1] = p
+    M[0, 2] = dst_mean[0] - (p * sx - q * sy)
+    M[1, 2] = dst_mean[1] - (q * sx + p * sy)
+    return M
+
+
+def estimate_similarity_transforms(src: np.ndarray) -> np.ndarray:
+    """
+    Vectorized estimate_similarity_transform for N faces against ARC_TEMPLATE.
     
-    # Scale - use element-wise multiply with diagonal, not trace
-    src_var = (src_demean ** 2).sum() / num
-    scale = np.sum(S * np.diag(D)) / src_var
+    Args:
+        src: Stacked source landmarks (Nx5x2)
+    
+    Returns:
+        Nx2x3 transformation matrices
+    """
+    num = src.shape[1]
     
-    # Translation
-    t = dst_mean - scale * (R @ src_mean)
+    src_mean = src.mean(axis=1)
+    src_demean = src - src_mean[:, None, :]
     
-    # Build 2x3 matrix
-    M = np.zeros((2, 3), dtype=np.float32)
-    M[:2, :2] = scale * R
-    M[:, 2] = t
+    # Per-face covariance dst^T @ src
+    A = (_DST_DEMEAN.T @ src_demean) / num
+    
+    src_var = (src_demean ** 2).sum(axis=(1, 2)) / num
+    p = (A[:, 0, 0] + A[:, 1, 1]) / src_var
+    q = (A[:, 1, 0] - A[:, 0, 1]) / src_var
+    sx, sy = src_mean[:, 0], src_mean[:, 1]
+    
+    M = np.empty((src.shape[0], 2, 3), dtype=np.float32)
+    M[:, 0, 0] = p
+    M[:, 0, 1] = -q
+    M[:, 1, 0] = q
+    M[:, 1, 1] = p
+    M[:, 0, 2] = _DST_MEAN[0] - (p * sx - q * sy)
+    M[:, 1, 2] = _DST_MEAN[1] - (q * sx + p * sy)
     return M
 
 
+def _warp_face(image: np.ndarray, M: np.ndarray, target_size: tuple) -> np.ndarray:
+    """Apply an alignment transform, skipping the warp when it is the identity."""
+    # Already aligned (e.g. a stored 112x112 crop): warpAffine would be a pure copy
+    width, height = target_size
+    if (
+        image.shape[0] >= height and image.shape[1] >= width
+        and np.abs(M - _IDENTITY).max() < IDENTITY_TOLERANCE
+    ):
+        return image[:height, :width].copy()
+    
+    # Warp image to align face
+    return cv2.warpAffine(
+        image, M, target_size,
+        flags=cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=(0, 0, 0)
+    )
+
+
 def align_face(
     image: np.ndarray,
     landmarks: np.ndarray,
@@ -92,22 +159,81 @@ def align_face(
     if landmarks is None or len(landmarks) < 5:
         return None
     
-    # Ensure landmarks are float32 and correct shape
-    src = np.array(landmarks[:5], dtype=np.float32).reshape(5, 2)
+    # Ensure landmarks are float32 and correct shape (no copy if already float32)
+    src = np.asarray(landmarks[:5], dtype=np.float32).reshape(5, 2)
     dst = ARC_TEMPLATE
     
     # Estimate similarity transform
     M = estimate_similarity_transform(src, dst)
     
-    # Warp image to align face
-    aligned = cv2.warpAffine(
-        image, M, target_size,
-        flags=cv2.INTER_LINEAR,
-        borderMode=cv2.BORDER_CONSTANT,
-        borderValue=(0, 0, 0)
-    )
+    return _warp_face(image, M, target_size)
+
+
+def batch_align_faces(
+    image: np.ndarray,
+    landmarks_list: list,
+    target_size: tuple = TARGET_SIZE,
+    use_cuda: bool = False,
+) -> List[Optional[np.ndarray]]:
+    """
+    Align several faces from the same image in one pass.
+    
+    The transforms for all faces are estimated together (stacked Nx5x2
+    landmarks); each face is then warped as in align_face.
+    
+    With use_cuda (and an OpenCV CUDA build with a device), the image is
+    uploaded once and all faces are warped on the GPU on one stream; only
+    the small aligned crops are downloaded. GPU bilinear sampling can differ
+    from the CPU warp by 1 intensity level on some pixels.
+    
+    Args:
+        image: Input image (BGR format from OpenCV)
+        landmarks_list: 5x2 landmark arrays, one per face (None allowed)
+        target_size: Output size (default 112x112 for ArcFace)
+        use_cuda: Warp on the GPU when OpenCV CUDA is available
+    
+    Returns:
+        Aligned face images, None where landmarks are missing
+    """
+    results: List[Optional[np.ndarray]] = [None] * len(landmarks_list)
+    valid = [i for i, lm in enumerate(landmarks_list) if lm is not None and len(lm) >= 5]
+    if not valid:
+        return results
+    
+    src = np.stack([
+        np.asarray(landmarks_list[i][:5], dtype=np.float32).reshape(5, 2) for i in valid
+    ])
+    Ms = estimate_similarity_transforms(src)
+    
+    if use_cuda and CUDA_AVAILABLE:
+        for i, aligned in zip(valid, _warp_faces_cuda(image, Ms, target_size)):
+            results[i] = aligned
+        return results
+    
+    for i, M in zip(valid, Ms):
+        results[i] = _warp_face(image, M, target_size)
+    return results
+
+
+def _warp_faces_cuda(image: np.ndarray, Ms: np.ndarray, target_size: tuple) -> List[np.ndarray]:
+    """Warp N faces out of one image on the GPU (single upload, one stream)."""
+    stream = cv2.cuda.Stream()
+    gpu_image = cv2.cuda_GpuMat()
+    gpu_image.upload(image, stream)
     
-    return aligned
+    gpu_faces = [
+        cv2.cuda.warpAffine(
+            gpu_image, M, target_size,
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(0, 0, 0),
+            stream=stream,
+        )
+        for M in Ms
+    ]
+    faces = [gpu_face.download(stream=stream) for gpu_face in gpu_faces]
+    stream.waitForCompletion()
+    return faces
 
 
 def align_face_from_bbox(
@@ -10,12 +10,20 @@ This prevents low-quality faces from being sent to recognition,
 which would waste compute and produce unreliable results.
 """
 
+import math
 import numpy as np
 import cv2
 import logging
 from typing import Optional, Tuple
 from dataclasses import dataclass
 
+# Numba JIT (optional) - single-pass Laplacian variance for blur scoring
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,18 +39,56 @@ class QualityResult:
 
 # Quality thresholds
 MIN_FACE_WIDTH = 80       # Minimum face width in pixels
-BLUR_THRESHOLD = 100.0    # Laplacian variance below this = blurry
+BLUR_THRESHOLD = 100.0    # Laplacian variance below this = blurry (native-resolution crop)
+BLUR_SAMPLE_SIZE = None   # Resample every crop's longer side to this before scoring (None = native)
 MAX_YAW_RATIO = 0.5       # Max asymmetry ratio for yaw detection
 MAX_PITCH_RATIO = 0.4     # Max ratio for pitch detection
 
 
-def compute_blur_score(face_image: np.ndarray) -> float:
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True, boundscheck=False)
+    def _laplacian_var_u8(gray):
+        """
+        Variance of the 4-neighbour Laplacian of a uint8 image in one pass.
+        
+        Same result as cv2.Laplacian(gray, cv2.CV_64F).var(): integer stencil
+        with BORDER_REFLECT_101 edges, accumulated as sum / sum of squares.
+        """
+        h, w = gray.shape
+        s = 0
+        ss = 0
+        for y in prange(h):
+            ym = y - 1 if y > 0 else min(1, h - 1)
+            yp = y + 1 if y < h - 1 else max(h - 2, 0)
+            for x in range(w):
+                xm = x - 1 if x > 0 else min(1, w - 1)
+                xp = x + 1 if x < w - 1 else max(w - 2, 0)
+                lap = (np.int64(gray[ym, x]) + np.int64(gray[yp, x])
+                       + np.int64(gray[y, xm]) + np.int64(gray[y, xp])
+                       - 4 * np.int64(gray[y, x]))
+                s += lap
+                ss += lap * lap
+        n = h * w
+        mean = s / n
+        return ss / n - mean * mean
+
+
+def compute_blur_score(face_image: np.ndarray, sample_size: Optional[int] = BLUR_SAMPLE_SIZE) -> float:
     """
     Compute blur score using Laplacian variance.
     Higher = sharper, lower = blurrier.
     
+    Laplacian variance depends on resolution (downsampling a soft edge makes
+    it sharper per pixel). With sample_size set, every crop - smaller or
+    larger - is resized, aspect-preserving, so its longer side equals
+    sample_size; scoring cost is then constant and one threshold applies to
+    all face sizes. That threshold is not BLUR_THRESHOLD (calibrated on
+    native-resolution crops) and has to be calibrated on real face crops
+    at the chosen sample size before enabling this.
+    
     Args:
         face_image: BGR face crop
+        sample_size: Longer side to resample the crop to (None = native resolution)
         
     Returns:
         Laplacian variance (higher is sharper)
@@ -50,7 +96,20 @@ def compute_blur_score(face_image: np.ndarray) -> float:
     if face_image is None or face_image.size == 0:
         return 0.0
     
+    # Convert once, then resample the single gray channel (a third of the
+    # bytes the resize would otherwise move)
     gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY)
+    if sample_size:
+        h, w = gray.shape
+        scale = sample_size / max(h, w)
+        if scale != 1.0:
+            size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            gray = cv2.resize(gray, size,
+                              interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+    
+    if NUMBA_AVAILABLE:
+        # Fused stencil + variance: no CV_64F Laplacian image, one pass over gray
+        return float(_laplacian_var_u8(gray))
     laplacian = cv2.Laplacian(gray, cv2.CV_64F)
     variance = laplacian.var()
     return float(variance)
@@ -71,32 +130,39 @@ def estimate_pose_from_landmarks(landmarks: np.ndarray) -> Tuple[float, float]:
     if landmarks is None or len(landmarks) < 5:
         return 0.0, 0.0
     
-    left_eye = landmarks[0]
-    right_eye = landmarks[1]
-    nose = landmarks[2]
-    left_mouth = landmarks[3]
-    right_mouth = landmarks[4]
+    # Plain Python floats: five 2-vectors are far too small for NumPy dispatch to pay off
+    (lex, ley), (rex, rey), (nx, ny), (_, lmy), (_, rmy) = np.asarray(
+        landmarks[:5], dtype=np.float64
+    ).reshape(5, 2).tolist()
     
+    return _pose_scores(lex, ley, rex, rey, nx, ny, lmy, rmy)
+
+
+def _pose_scores(lex, ley, rex, rey, nx, ny, lmy, rmy):
+    """Yaw/pitch scores from landmark coordinates (scalar math, also JIT-compiled)."""
     # Eye distance (reference)
-    eye_dist = np.linalg.norm(right_eye - left_eye)
-    if eye_dist < 1:
+    dx = rex - lex
+    dy = rey - ley
+    eye_dist2 = dx * dx + dy * dy
+    if eye_dist2 < 1:
         return 0.0, 0.0
     
     # YAW estimation: Compare nose position relative to eye midpoint
     # In frontal face, nose is centered between eyes
-    eye_center = (left_eye + right_eye) / 2
-    nose_offset = nose[0] - eye_center[0]
-    yaw_ratio = abs(nose_offset) / (eye_dist / 2)
+    eye_center_x = 0.5 * (lex + rex)
+    eye_center_y = 0.5 * (ley + rey)
+    nose_offset = nx - eye_center_x
+    yaw_ratio = 2.0 * abs(nose_offset) / math.sqrt(eye_dist2)
     yaw_score = min(yaw_ratio, 1.0)
     
     # PITCH estimation: Compare vertical distances
     # In frontal face, nose is roughly centered vertically
-    mouth_center = (left_mouth + right_mouth) / 2
-    face_height = mouth_center[1] - eye_center[1]
+    mouth_center_y = 0.5 * (lmy + rmy)
+    face_height = mouth_center_y - eye_center_y
     
     if face_height > 0:
-        nose_to_eyes = nose[1] - eye_center[1]
-        nose_to_mouth = mouth_center[1] - nose[1]
+        nose_to_eyes = ny - eye_center_y
+        nose_to_mouth = mouth_center_y - ny
         
         # Ideal ratio is roughly 1:1 for eyes-nose and nose-mouth
         if nose_to_mouth > 0:
@@ -110,6 +176,38 @@ def estimate_pose_from_landmarks(landmarks: np.ndarray) -> Tuple[float, float]:
     return yaw_score, pitch_score
 
 
+if NUMBA_AVAILABLE:
+    _pose_scores_nb = njit(cache=True)(_pose_scores)
+    
+    @njit(cache=True)
+    def _quality_kernel(bboxes, landmarks, widths, yaws, pitches):
+        """
+        Face widths and pose scores for N detections (bboxes Nx4, landmarks Nx5x2).
+        
+        Not parallel: a frame has tens of faces at most, less than the cost of
+        waking worker threads. Rows of zero landmarks score as frontal.
+        """
+        for i in range(bboxes.shape[0]):
+            widths[i] = int(bboxes[i, 2]) - int(bboxes[i, 0])
+            lm = landmarks[i]
+            yaws[i], pitches[i] = _pose_scores_nb(
+                lm[0, 0], lm[0, 1], lm[1, 0], lm[1, 1], lm[2, 0], lm[2, 1], lm[3, 1], lm[4, 1]
+            )
+
+
+def _crop_blur_score(frame: np.ndarray, x1: int, y1: int, x2: int, y2: int) -> Optional[float]:
+    """Blur score of the bbox region clamped to the frame (None if it is empty)."""
+    h, w = frame.shape[:2]
+    x1_clamp = max(0, x1)
+    y1_clamp = max(0, y1)
+    x2_clamp = min(w, x2)
+    y2_clamp = min(h, y2)
+    
+    if x2_clamp > x1_clamp and y2_clamp > y1_clamp:
+        return compute_blur_score(frame[y1_clamp:y2_clamp, x1_clamp:x2_clamp])
+    return None
+
+
 def assess_face_quality(
     bbox: np.ndarray,
     landmarks: Optional[np.ndarray],
@@ -118,10 +216,14 @@ def assess_face_quality(
     blur_threshold: float = BLUR_THRESHOLD,
     max_yaw: float = MAX_YAW_RATIO,
     max_pitch: float = MAX_PITCH_RATIO,
+    skip_blur_width: Optional[int] = None,
 ) -> QualityResult:
     """
     Assess face quality for recognition suitability.
     
+    The blur check (the only costly one) can be skipped for faces wider than
+    skip_blur_width, which are assumed sharp enough.
+    
     Args:
         bbox: Face bounding box [x1, y1, x2, y2]
         landmarks: 5-point facial landmarks (optional)
@@ -130,14 +232,43 @@ def assess_face_quality(
         blur_threshold: Minimum Laplacian variance (higher = sharper required)
         max_yaw: Maximum yaw score (0-1) before rejection
         max_pitch: Maximum pitch score (0-1) before rejection
+        skip_blur_width: Skip the blur check for faces wider than this (optional)
         
     Returns:
         QualityResult with pass/fail and scores
     """
+    reason, face_width, blur_score, pose_score = _quality_check(
+        bbox, landmarks, frame, min_width, blur_threshold, max_yaw, max_pitch,
+        skip_blur_width,
+    )
+    return QualityResult(
+        passed=reason is None,
+        face_width=face_width,
+        blur_score=blur_score,
+        pose_score=pose_score,
+        rejection_reason=reason
+    )
+
+
+def _quality_check(
+    bbox: np.ndarray,
+    landmarks: Optional[np.ndarray],
+    frame: Optional[np.ndarray],
+    min_width: int,
+    blur_threshold: float,
+    max_yaw: float,
+    max_pitch: float,
+    skip_blur_width: Optional[int] = None,
+) -> Tuple[Optional[str], int, float, float]:
+    """
+    Checks behind assess_face_quality, without building a QualityResult.
+    
+    Returns:
+        (rejection_reason or None, face_width, blur_score, pose_score)
+    """
     # Calculate face dimensions
     x1, y1, x2, y2 = int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])
     face_width = x2 - x1
-    face_height = y2 - y1
     
     # Default scores
     blur_score = BLUR_THRESHOLD + 1  # Default to passing
@@ -147,37 +278,20 @@ def assess_face_quality(
     # CHECK 1: Face Size
     # =========================
     if face_width < min_width:
-        return QualityResult(
-            passed=False,
-            face_width=face_width,
-            blur_score=blur_score,
-            pose_score=pose_score,
-            rejection_reason=f"Face too small: {face_width}px < {min_width}px minimum"
-        )
+        reason = f"Face too small: {face_width}px < {min_width}px minimum"
+        return reason, face_width, blur_score, pose_score
     
     # =========================
     # CHECK 2: Blur (if frame provided)
     # =========================
-    if frame is not None:
-        # Extract face region
-        h, w = frame.shape[:2]
-        x1_clamp = max(0, x1)
-        y1_clamp = max(0, y1)
-        x2_clamp = min(w, x2)
-        y2_clamp = min(h, y2)
-        
-        if x2_clamp > x1_clamp and y2_clamp > y1_clamp:
-            face_crop = frame[y1_clamp:y2_clamp, x1_clamp:x2_clamp]
-            blur_score = compute_blur_score(face_crop)
+    if frame is not None and (skip_blur_width is None or face_width <= skip_blur_width):
+        crop_blur_score = _crop_blur_score(frame, x1, y1, x2, y2)
+        if crop_blur_score is not None:
+            blur_score = crop_blur_score
             
             if blur_score < blur_threshold:
-                return QualityResult(
-                    passed=False,
-                    face_width=face_width,
-                    blur_score=blur_score,
-                    pose_score=pose_score,
-                    rejection_reason=f"Face too blurry: {blur_score:.1f} < {blur_threshold:.1f}"
-                )
+                reason = f"Face too blurry: {blur_score:.1f} < {blur_threshold:.1f}"
+                return reason, face_width, blur_score, pose_score
     
     # =========================
     # CHECK 3: Head Pose (if landmarks provided)
@@ -187,31 +301,15 @@ def assess_face_quality(
         pose_score = max(yaw_score, pitch_score)
         
         if yaw_score > max_yaw:
-            return QualityResult(
-                passed=False,
-                face_width=face_width,
-                blur_score=blur_score,
-                pose_score=pose_score,
-                rejection_reason=f"Extreme yaw: {yaw_score:.2f} > {max_yaw:.2f}"
-            )
+            reason = f"Extreme yaw: {yaw_score:.2f} > {max_yaw:.2f}"
+            return reason, face_width, blur_score, pose_score
         
         if pitch_score > max_pitch:
-            return QualityResult(
-                passed=False,
-                face_width=face_width,
-                blur_score=blur_score,
-                pose_score=pose_score,
-                rejection_reason=f"Extreme pitch: {pitch_score:.2f} > {max_pitch:.2f}"
-            )
+            reason = f"Extreme pitch: {pitch_score:.2f} > {max_pitch:.2f}"
+            return reason, face_width, blur_score, pose_score
     
     # All checks passed
-    return QualityResult(
-        passed=True,
-        face_width=face_width,
-        blur_score=blur_score,
-        pose_score=pose_score,
-        rejection_reason=None
-    )
+    return None, face_width, blur_score, pose_score
 
 
 def filter_quality_detections(
@@ -221,6 +319,7 @@ def filter_quality_detections(
     blur_threshold: float = BLUR_THRESHOLD,
     check_blur: bool = True,
     check_pose: bool = True,
+    skip_blur_width: Optional[int] = None,
 ) -> list:
     """
     Filter detections to keep only high-quality faces.
@@ -232,28 +331,105 @@ def filter_quality_detections(
         blur_threshold: Minimum sharpness
         check_blur: Whether to check blur
         check_pose: Whether to check head pose
+        skip_blur_width: Skip the blur check for faces wider than this (optional)
         
     Returns:
         Filtered list of detections that pass quality checks
     """
-    filtered = []
-    
-    for det in detections:
-        quality = assess_face_quality(
-            bbox=det.bbox,
-            landmarks=det.landmarks,
+    if NUMBA_AVAILABLE and detections:
+        filtered = _filter_quality_batch(
+            detections,
             frame=frame if check_blur else None,
             min_width=min_width,
             blur_threshold=blur_threshold if check_blur else 0,
+            skip_blur_width=skip_blur_width,
+        )
+    else:
+        filtered = _filter_quality_each(
+            detections,
+            frame=frame if check_blur else None,
+            min_width=min_width,
+            blur_threshold=blur_threshold if check_blur else 0,
+            skip_blur_width=skip_blur_width,
         )
-        
-        if quality.passed:
-            filtered.append(det)
-        else:
-            logger.debug(f"Rejected detection: {quality.rejection_reason}")
     
     rejected_count = len(detections) - len(filtered)
     if rejected_count > 0:
         logger.debug(f"Quality filter: {rejected_count}/{len(detections)} faces rejected")
     
     return filtered
+
+
+def _filter_quality_each(
+    detections: list,
+    frame: Optional[np.ndarray],
+    min_width: int,
+    blur_threshold: float,
+    skip_blur_width: Optional[int],
+) -> list:
+    """filter_quality_detections checking one detection at a time (no QualityResult)."""
+    filtered = []
+    
+    for det in detections:
+        reason = _quality_check(
+            det.bbox, det.landmarks, frame, min_width, blur_threshold,
+            MAX_YAW_RATIO, MAX_PITCH_RATIO, skip_blur_width=skip_blur_width,
+        )[0]
+        
+        if reason is None:
+            filtered.append(det)
+        else:
+            logger.debug(f"Rejected detection: {reason}")
+    
+    return filtered
+
+
+def _filter_quality_batch(
+    detections: list,
+    frame: Optional[np.ndarray],
+    min_width: int,
+    blur_threshold: float,
+    skip_blur_width: Optional[int],
+) -> list:
+    """
+    filter_quality_detections with size and pose scored for all detections in
+    one JIT kernel call; same checks, order and outcome as assess_face_quality.
+    
+    Blur (OpenCV) only runs for faces that pass the size check, and no
+    QualityResult is built - rejections just log their reason.
+    """
+    n = len(detections)
+    bboxes = np.empty((n, 4), dtype=np.float64)
+    landmarks = np.zeros((n, 5, 2), dtype=np.float64)  # Zeros = no landmarks (frontal)
+    for i, det in enumerate(detections):
+        bboxes[i] = det.bbox[:4]
+        if det.landmarks is not None and len(det.landmarks) >= 5:
+            landmarks[i] = np.asarray(det.landmarks[:5]).reshape(5, 2)
+    
+    widths = np.empty(n, dtype=np.int64)
+    yaws = np.empty(n, dtype=np.float64)
+    pitches = np.empty(n, dtype=np.float64)
+    _quality_kernel(bboxes, landmarks, widths, yaws, pitches)
+    
+    filtered = []
+    for i, det in enumerate(detections):
+        reason = None
+        if widths[i] < min_width:
+            reason = f"Face too small: {widths[i]}px < {min_width}px minimum"
+        else:
+            if frame is not None and (skip_blur_width is None or widths[i] <= skip_blur_width):
+                x1, y1, x2, y2 = (int(v) for v in bboxes[i])
+                blur_score = _crop_blur_score(frame, x1, y1, x2, y2)
+                if blur_score is not None and blur_score < blur_threshold:
+                    reason = f"Face too blurry: {blur_score:.1f} < {blur_threshold:.1f}"
+            if reason is None and yaws[i] > MAX_YAW_RATIO:
+                reason = f"Extreme yaw: {yaws[i]:.2f} > {MAX_YAW_RATIO:.2f}"
+            elif reason is None and pitches[i] > MAX_PITCH_RATIO:
+                reason = f"Extreme pitch: {pitches[i]:.2f} > {MAX_PITCH_RATIO:.2f}"
+        
+        if reason is None:
+            filtered.append(det)
+        else:
+            logger.debug(f"Rejected detection: {reason}")
+    
+    return filtered
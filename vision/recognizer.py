@@ -3,6 +3,7 @@ ArcFace Face Recognition using ONNX Runtime.
 Extracts 512-dimensional face embeddings for recognition.
 """
 
+import os
 import numpy as np
 import cv2
 import logging
@@ -17,6 +18,18 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+def int8_model_path(model_path: str) -> str:
+    """Path of the INT8 model produced by quantize_arcface.py for model_path."""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.int8{ext or '.onnx'}"
+
+
+def fp16_model_path(model_path: str) -> str:
+    """Path of the FP16 model produced by quantize_arcface.py --precision fp16."""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.fp16{ext or '.onnx'}"
+
+
 class ArcFaceRecognizer:
     """
     ArcFace face recognition model.
@@ -26,14 +39,24 @@ class ArcFaceRecognizer:
     def __init__(
         self,
         model_path: str = "models/w600k_r50.onnx",
-        input_size: tuple = (112, 112)
+        input_size: tuple = (112, 112),
+        prefer_int8: bool = True,
+        prefer_fp16: bool = True
     ):
         self.model_path = model_path
         self.input_size = input_size
+        self.prefer_int8 = prefer_int8
+        self.prefer_fp16 = prefer_fp16
         
         self._session = None
         self._input_name = None
         self._output_name = None
+        self._input_dtype = np.float32  # float16 for the FP16 model
+        self._output_dtype = np.float32
+        # batch size -> (IOBinding, output buffer ORT writes into); None = plain run()
+        self._bindings: Optional[dict] = None
+        # Inference runs on CUDA (callers can keep alignment on the GPU too)
+        self.uses_cuda = False
         
         self._load_model()
     
@@ -49,19 +72,45 @@ class ArcFaceRecognizer:
             if 'CUDAExecutionProvider' in ort.get_available_providers():
                 providers = ['CUDAExecutionProvider', 'CPUExecutionProvider']
             
-            self._session = ort.InferenceSession(
-                self.model_path,
-                providers=providers
-            )
+            # Prefer the validated reduced-precision models from quantize_arcface.py:
+            # FP16 on CUDA (tensor cores), INT8 (QDQ) on CPU
+            model_path = self.model_path
+            if providers[0] == 'CUDAExecutionProvider':
+                candidate = fp16_model_path(self.model_path) if self.prefer_fp16 else None
+            else:
+                candidate = int8_model_path(self.model_path) if self.prefer_int8 else None
+            if candidate and os.path.exists(candidate):
+                model_path = candidate
+            
+            try:
+                self._session = ort.InferenceSession(model_path, providers=providers)
+            except Exception as e:
+                if model_path == self.model_path:
+                    raise
+                logger.warning(f"Failed to load {model_path} ({e}), using FP32 model")
+                model_path = self.model_path
+                self._session = ort.InferenceSession(model_path, providers=providers)
+            
+            self.uses_cuda = self._session.get_providers()[0] == 'CUDAExecutionProvider'
             
             self._input_name = self._session.get_inputs()[0].name
             self._output_name = self._session.get_outputs()[0].name
             
+            # FP16 models take and return float16 tensors
+            input_type = self._session.get_inputs()[0].type
+            output_type = self._session.get_outputs()[0].type
+            self._input_dtype = np.float16 if input_type == 'tensor(float16)' else np.float32
+            self._output_dtype = np.float16 if output_type == 'tensor(float16)' else np.float32
+            
             # Get embedding dimension
             output_shape = self._session.get_outputs()[0].shape
             self.embedding_dim = output_shape[-1] if len(output_shape) > 1 else 512
             
-            logger.info(f"Loaded ArcFace model from {self.model_path}")
+            # Fixed output width lets outputs be bound to preallocated buffers
+            if isinstance(self.embedding_dim, int):
+                self._bindings = {}
+            
+            logger.info(f"Loaded ArcFace model from {model_path}")
             logger.info(f"Embedding dimension: {self.embedding_dim}")
             
         except Exception as e:
@@ -76,29 +125,50 @@ class ArcFaceRecognizer:
         - Normalize: (arr - 127.5) / 128.0
         - Format: RGB, CHW
         
+        cv2.dnn.blobFromImage does resize, BGR->RGB, mean/scale and HWC->CHW
+        in one native pass; bit-identical to the NumPy chain.
+        
         Args:
             face: Aligned face image (112x112 BGR)
         
         Returns:
             Preprocessed blob (1, 3, 112, 112)
         """
-        # Resize if needed
-        if face.shape[:2] != self.input_size:
-            face = cv2.resize(face, self.input_size)
-        
-        # Convert BGR to RGB
-        face = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
+        return cv2.dnn.blobFromImage(
+            face, scalefactor=1 / 128.0, size=self.input_size,
+            mean=(127.5, 127.5, 127.5), swapRB=True, crop=False
+        )
+    
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        """
+        Run the model on a preprocessed (N, 3, H, W) blob.
         
-        # Normalize to [-1, 1] - MUST match backend: (arr - 127.5) / 128.0
-        face = (face.astype(np.float32) - 127.5) / 128.0
+        Uses one IOBinding per batch size: the blob is bound in place and ORT
+        writes the (N, D) output straight into a persistent buffer, so no
+        output tensor is allocated per call (and with CUDA the device->host
+        copy lands directly in it). The returned buffer is overwritten by the
+        next call with the same batch size.
+        """
+        if blob.dtype != self._input_dtype:
+            blob = blob.astype(self._input_dtype)  # FP16 model: half the H2D bytes
         
-        # HWC to CHW
-        face = face.transpose(2, 0, 1)
+        if self._bindings is None:
+            return self._session.run([self._output_name], {self._input_name: blob})[0]
         
-        # Add batch dimension
-        face = np.expand_dims(face, axis=0)
+        batch_size = blob.shape[0]
+        entry = self._bindings.get(batch_size)
+        if entry is None:
+            output = np.empty((batch_size, self.embedding_dim), dtype=self._output_dtype)
+            binding = self._session.io_binding()
+            binding.bind_ortvalue_output(
+                self._output_name, ort.OrtValue.ortvalue_from_numpy(output)
+            )
+            entry = self._bindings[batch_size] = (binding, output)
         
-        return face
+        binding, output = entry
+        binding.bind_cpu_input(self._input_name, blob)
+        self._session.run_with_iobinding(binding)
+        return output
     
     def get_embedding(self, face: np.ndarray) -> Optional[np.ndarray]:
         """
@@ -119,16 +189,11 @@ class ArcFaceRecognizer:
             blob = self._preprocess(face)
             
             # Run inference
-            embedding = self._session.run(
-                [self._output_name],
-                {self._input_name: blob}
-            )[0]
+            embedding = self._run(blob)
             
-            # Flatten and normalize
-            embedding = embedding.flatten()
-            norm = np.linalg.norm(embedding)
-            if norm > 0:
-                embedding = embedding / norm
+            # Copy out of the reused output buffer as float32, then L2-normalize in place
+            embedding = embedding.reshape(-1).astype(np.float32)
+            embedding *= 1.0 / np.sqrt(np.dot(embedding, embedding) + 1e-12)
             
             return embedding
             
@@ -150,30 +215,20 @@ class ArcFaceRecognizer:
             return [None] * len(faces)
         
         try:
-            # Preprocess all faces
-            blobs = []
-            for face in faces:
-                blob = self._preprocess(face)
-                blobs.append(blob[0])  # Remove batch dim for stacking
-            
-            batch = np.stack(blobs, axis=0)
+            # Preprocess all faces into one (N, 3, 112, 112) blob
+            batch = cv2.dnn.blobFromImages(
+                faces, scalefactor=1 / 128.0, size=self.input_size,
+                mean=(127.5, 127.5, 127.5), swapRB=True, crop=False
+            )
             
             # Run batch inference
-            embeddings = self._session.run(
-                [self._output_name],
-                {self._input_name: batch}
-            )[0]
-            
-            # Normalize each embedding
-            results = []
-            for emb in embeddings:
-                emb = emb.flatten()
-                norm = np.linalg.norm(emb)
-                if norm > 0:
-                    emb = emb / norm
-                results.append(emb)
-            
-            return results
+            embeddings = self._run(batch)
+            
+            # L2-normalize all rows in one vectorized pass (into a new array, the
+            # output buffer is reused by the next call)
+            embeddings = embeddings.reshape(len(faces), -1).astype(np.float32, copy=False)
+            norms = np.sqrt(np.einsum("ij,ij->i", embeddings, embeddings)) + 1e-12
+            return list(embeddings / norms[:, None])
             
         except Exception as e:
             logger.error(f"Batch embedding error: {e}")
@@ -193,6 +248,21 @@ class ArcFaceRecognizer:
         """
         return float(np.dot(emb1, emb2))
     
+    @staticmethod
+    def compute_similarity_batch(probe: np.ndarray, gallery: np.ndarray) -> np.ndarray:
+        """
+        Compute cosine similarity between one embedding and a gallery (one BLAS gemv).
+        
+        Args:
+            probe: Query embedding (normalized, D)
+            gallery: Stacked embeddings (normalized, NxD); float16 galleries
+                are upcast to float32 for the product
+        
+        Returns:
+            Similarity scores (N,)
+        """
+        return gallery.astype(np.float32, copy=False) @ probe.astype(np.float32, copy=False)
+    
     @staticmethod
     def compute_distance(emb1: np.ndarray, emb2: np.ndarray) -> float:
         """
@@ -24,10 +24,9 @@ This IS production-ready for real-world gate control.
 
 import numpy as np
 from dataclasses import dataclass, field
-from typing import Optional, List, Tuple, Dict, Set
-from enum import Enum
+from typing import Optional, List, Sequence, Tuple, Dict, Set
+from enum import IntEnum
 import logging
-from collections import deque
 import time
 
 try:
@@ -36,24 +35,121 @@ try:
 except ImportError:
     SCIPY_AVAILABLE = False
 
+# Numba JIT (optional) - scalar cost-matrix kernel for a handful of faces
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 
 logger = logging.getLogger(__name__)
 
 
-class TrackPhase(Enum):
+def _box_iou_matrix(dets: np.ndarray, trks: np.ndarray) -> np.ndarray:
+    """
+    IoU between every detection and track bbox in one broadcast pass.
+    
+    Args:
+        dets: (N, 4) array of [x1, y1, x2, y2]
+        trks: (M, 4) array of [x1, y1, x2, y2]
+    
+    Returns:
+        (N, M) IoU matrix (0 where the union is empty)
+    """
+    inter_upperlefts = np.maximum(dets[:, None, :2], trks[:, :2])
+    inter_lowerrights = np.minimum(dets[:, None, 2:], trks[:, 2:])
+    wh = (inter_lowerrights - inter_upperlefts).clip(min=0)
+    inter = wh[..., 0] * wh[..., 1]
+    
+    areas_d = (dets[:, 2] - dets[:, 0]) * (dets[:, 3] - dets[:, 1])
+    areas_t = (trks[:, 2] - trks[:, 0]) * (trks[:, 3] - trks[:, 1])
+    union = areas_d[:, None] + areas_t - inter
+    
+    iou = np.zeros_like(inter)
+    np.divide(inter, union, out=iou, where=union > 0)
+    return iou
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _build_cost_njit(det_boxes, trk_boxes, det_embs, trk_embs, det_has_emb, phases,
+                         iou_thr, emb_thr, w, invalid):
+        """
+        Gated cost matrix for N detections x M tracks in one scalar pass.
+        
+        det_boxes/trk_boxes are float32 (N,4)/(M,4); det_embs/trk_embs are
+        float32 (N,d)/(M,d). phases[t] is 1 for tracks whose cost includes the
+        embedding term (CONFIRMED/RECOGNIZED with an embedding), 0 for IoU only.
+        Same costs as the NumPy path in _compute_cost_matrix.
+        """
+        n_det = det_boxes.shape[0]
+        n_trk = trk_boxes.shape[0]
+        dim = det_embs.shape[1]
+        cost = np.empty((n_det, n_trk), dtype=np.float32)
+        
+        # Track areas once, not once per detection
+        trk_areas = np.empty(n_trk, dtype=np.float32)
+        for j in range(n_trk):
+            trk_areas[j] = (trk_boxes[j, 2] - trk_boxes[j, 0]) * (trk_boxes[j, 3] - trk_boxes[j, 1])
+        
+        for i in range(n_det):
+            dx1, dy1, dx2, dy2 = det_boxes[i, 0], det_boxes[i, 1], det_boxes[i, 2], det_boxes[i, 3]
+            det_area = (dx2 - dx1) * (dy2 - dy1)
+            for j in range(n_trk):
+                tx1, ty1, tx2, ty2 = trk_boxes[j, 0], trk_boxes[j, 1], trk_boxes[j, 2], trk_boxes[j, 3]
+                inter = max(0.0, min(dx2, tx2) - max(dx1, tx1)) * max(0.0, min(dy2, ty2) - max(dy1, ty1))
+                union = det_area + trk_areas[j] - inter
+                iou = inter / union if union > 0 else 0.0
+                
+                if iou < iou_thr:
+                    cost[i, j] = invalid
+                    continue
+                if phases[j] == 0 or det_has_emb[i] == 0:
+                    cost[i, j] = 1.0 - iou
+                    continue
+                
+                similarity = 0.0
+                for k in range(dim):
+                    similarity += det_embs[i, k] * trk_embs[j, k]
+                emb_distance = 1.0 - similarity
+                if emb_distance > emb_thr:
+                    cost[i, j] = invalid
+                else:
+                    cost[i, j] = (1.0 - w) * (1.0 - iou) + w * emb_distance
+        return cost
+
+
+def _pack_embeddings(embeddings: List[Optional[np.ndarray]], dim: int) -> np.ndarray:
+    """Stack embeddings into a float32 (len, dim) array, zero rows for None."""
+    packed = np.zeros((len(embeddings), dim), dtype=np.float32)
+    for i, embedding in enumerate(embeddings):
+        if embedding is not None:
+            packed[i] = embedding
+    return packed
+
+
+class TrackPhase(IntEnum):
     """
     Track lifecycle phases.
     
     TENTATIVE: New track, building confidence via IoU matching only
     CONFIRMED: Stable track, ready for recognition, embeddings active
     RECOGNIZED: Recognition complete, track fully identified
+    
+    Ordered ints, so "confirmed or later" is phase >= CONFIRMED and the
+    tracker's per-track phase array stores them directly.
     """
-    TENTATIVE = "tentative"
-    CONFIRMED = "confirmed"
-    RECOGNIZED = "recognized"
+    TENTATIVE = 0
+    CONFIRMED = 1
+    RECOGNIZED = 2
+
 
+# Embeddings averaged into a confirmed track's embedding
+EMBEDDING_HISTORY = 5
 
-@dataclass
+
+@dataclass(slots=True)
 class Track:
     """
     Represents a tracked face through its lifecycle.
@@ -78,7 +174,10 @@ class Track:
     
     # Embedding (only used when CONFIRMED+)
     embedding: Optional[np.ndarray] = None
-    embedding_history: deque = field(default_factory=lambda: deque(maxlen=5))
+    # Last EMBEDDING_HISTORY embeddings (ring buffer) and their running sum
+    _emb_ring: Optional[np.ndarray] = field(default=None, repr=False)
+    _emb_sum: Optional[np.ndarray] = field(default=None, repr=False)
+    _emb_count: int = field(default=0, repr=False)
     
     # Recognition state (set when RECOGNIZED)
     recognized: bool = False      # CRITICAL: True = never recognize again
@@ -95,7 +194,36 @@ class Track:
     
     def is_confirmed(self) -> bool:
         """Track has enough hits to be reliable."""
-        return self.phase in (TrackPhase.CONFIRMED, TrackPhase.RECOGNIZED)
+        return self.phase >= TrackPhase.CONFIRMED
+    
+    def add_embedding(self, embedding: np.ndarray) -> np.ndarray:
+        """
+        Add an embedding to the history and return the mean of the last
+        EMBEDDING_HISTORY embeddings (not normalized).
+        
+        The window sum is updated in place (subtract the evicted row, add the
+        new one), so each call is O(d) with no list or temporary stack.
+        """
+        dim = len(embedding)
+        if self._emb_ring is None or self._emb_ring.shape[1] != dim:
+            self._emb_ring = np.zeros((EMBEDDING_HISTORY, dim), dtype=np.float32)
+            self._emb_sum = np.zeros(dim, dtype=np.float64)  # float64: no drift
+            self._emb_count = 0
+        
+        slot = self._emb_count % EMBEDDING_HISTORY
+        if self._emb_count >= EMBEDDING_HISTORY:
+            self._emb_sum -= self._emb_ring[slot]
+        self._emb_ring[slot] = embedding
+        self._emb_sum += self._emb_ring[slot]
+        self._emb_count += 1
+        
+        return (self._emb_sum / min(self._emb_count, EMBEDDING_HISTORY)).astype(np.float32)
+    
+    def clear_embedding_history(self):
+        """Forget all embeddings added with add_embedding."""
+        self._emb_count = 0
+        if self._emb_sum is not None:
+            self._emb_sum[:] = 0.0
     
     def is_ready_for_recognition(self) -> bool:
         """
@@ -139,7 +267,7 @@ class Track:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class TrackerStatistics:
     """
     Track-based statistics (NOT detection-based).
@@ -210,6 +338,8 @@ class DeepSORTLiteTracker:
     
     # Cost matrix constants
     COST_INVALID = 1e6  # Cost for invalid matches (prevents Hungarian from selecting)
+    NJIT_MAX_PAIRS = 64  # Below this many pairs, build costs with the Numba kernel
+    BATCH_NORMALIZE_MIN = 6  # Normalize this many updated embeddings in one pass
     
     def __init__(
         self,
@@ -238,6 +368,8 @@ class DeepSORTLiteTracker:
         # Track storage
         self._tracks: List[Track] = []
         self._next_id: int = 1
+        self._reset_arrays()
+        self._confirmed_cache: List[Track] = []  # Refreshed by _get_confirmed_tracks
         
         # Statistics
         self._stats = TrackerStatistics()
@@ -262,6 +394,44 @@ class DeepSORTLiteTracker:
                        embedding: face embedding or None
                        landmarks: 5x2 facial landmarks or None (for face alignment)
         
+        Returns:
+            List of CONFIRMED tracks (for UI/gate control)
+        
+        Stacks the tuples and calls update_batched; callers that already
+        hold arrays should call update_batched directly.
+        """
+        n_det = len(detections)
+        dim = next((len(d[2]) for d in detections if d[2] is not None), 0)
+        
+        return self.update_batched(
+            np.array([d[0] for d in detections], dtype=np.float32).reshape(n_det, 4),
+            np.array([d[1] for d in detections], dtype=np.float32),
+            embeddings=_pack_embeddings([d[2] for d in detections], dim) if dim else None,
+            emb_valid=np.array([d[2] is not None for d in detections], dtype=bool),
+            landmarks=[d[3] for d in detections],
+        )
+    
+    def update_batched(
+        self,
+        bboxes: np.ndarray,
+        scores: np.ndarray,
+        embeddings: Optional[np.ndarray] = None,
+        emb_valid: Optional[np.ndarray] = None,
+        landmarks: Optional[Sequence[Optional[np.ndarray]]] = None,
+    ) -> List[Track]:
+        """
+        Update tracker with new detections given as arrays.
+        
+        Args:
+            bboxes: (N, 4) float32 [x1, y1, x2, y2]
+            scores: (N,) detection confidences
+            embeddings: (N, d) float32 L2-normalized face embeddings, or None
+            emb_valid: (N,) bool, False for rows of embeddings that are not set
+                       (default: all rows valid when embeddings is given)
+            landmarks: N 5x2 facial landmarks (entries may be None), or None
+        
+        The arrays are not kept: tracks copy what they store.
+        
         Returns:
             List of CONFIRMED tracks (for UI/gate control)
         
@@ -278,52 +448,81 @@ class DeepSORTLiteTracker:
         # ==========================================
         # STEP 1: PREDICT (age all tracks)
         # ==========================================
-        for track in self._tracks:
-            track.age += 1
-            track.time_since_update += 1
+        self._age_arr += 1
+        self._tsu_arr += 1
         
-        if not detections:
+        n_det = len(bboxes)
+        bboxes = np.asarray(bboxes, dtype=np.float32)
+        if n_det == 0:
             self._remove_dead_tracks()
             return self._get_confirmed_tracks()
         
-        # ==========================================
-        # STEP 2: BUILD COST MATRIX WITH HARD GATING
-        # ==========================================
-        cost_matrix = self._compute_cost_matrix(detections, self._tracks)
+        if embeddings is None:
+            emb_valid = np.zeros(n_det, dtype=bool)
+        elif emb_valid is None:
+            emb_valid = np.ones(n_det, dtype=bool)
         
-        # ==========================================
-        # STEP 3: HUNGARIAN ASSIGNMENT
-        # ==========================================
-        matched_det_indices, matched_trk_indices = self._hungarian_assignment(cost_matrix)
+        def det_embedding(d_idx: int) -> Optional[np.ndarray]:
+            return embeddings[d_idx] if emb_valid[d_idx] else None
+        
+        if not self._tracks:
+            # No tracks to match: every detection starts a new track (step 5)
+            cost_matrix = None
+            matched_det_indices, matched_trk_indices = (), ()
+        else:
+            # ==========================================
+            # STEP 2: BUILD COST MATRIX WITH HARD GATING
+            # ==========================================
+            cost_matrix = self._compute_cost_matrix(bboxes, embeddings, emb_valid)
+            
+            # ==========================================
+            # STEP 3: HUNGARIAN ASSIGNMENT
+            # ==========================================
+            matched_det_indices, matched_trk_indices = self._hungarian_assignment(cost_matrix)
         
         # Build match sets
         matched_dets: Set[int] = set()
         matched_trks: Set[int] = set()
+        averaged_rows: List[int] = []  # Tracks whose embedding needs normalizing
         
         # ==========================================
         # STEP 4: PROCESS MATCHES
         # ==========================================
         for d_idx, t_idx in zip(matched_det_indices, matched_trk_indices):
-            # Validate match (should already be valid due to hard gating, but double-check)
-            det_bbox, det_score, det_embedding, det_landmarks = detections[d_idx]
-            track = self._tracks[t_idx]
-            
-            iou = self._compute_iou(det_bbox, track.bbox)
-            if iou < self.iou_threshold:
+            # Validate match (should already be valid due to hard gating, but double-check).
+            # The cost matrix already holds the IoU gate: no need to recompute IoU
+            if cost_matrix[d_idx, t_idx] >= self.COST_INVALID * 0.5:
                 # Invalid match (shouldn't happen with proper hard gating)
                 continue
             
+            track = self._tracks[t_idx]
+            
             # Update track with detection
-            self._update_track_with_detection(track, det_bbox, det_score, det_embedding, det_landmarks)
+            if self._update_track_with_detection(
+                track, bboxes[d_idx], float(scores[d_idx]), det_embedding(d_idx),
+                landmarks[d_idx] if landmarks is not None else None,
+            ):
+                averaged_rows.append(t_idx)
+            self._sync_row(t_idx)
+            self._tsu_arr[t_idx] = 0
             matched_dets.add(d_idx)
             matched_trks.add(t_idx)
         
+        # L2 normalize all re-averaged track embeddings in one pass
+        if averaged_rows:
+            self._normalize_embeddings(averaged_rows)
+        
         # ==========================================
         # STEP 5: CREATE NEW TRACKS FOR UNMATCHED DETECTIONS
         # ==========================================
-        for d_idx, (bbox, score, embedding, landmarks) in enumerate(detections):
+        n_existing = len(self._tracks)
+        for d_idx in range(n_det):
             if d_idx not in matched_dets:
-                self._create_track(bbox, score, embedding, landmarks)
+                self._create_track(
+                    bboxes[d_idx], float(scores[d_idx]), det_embedding(d_idx),
+                    landmarks[d_idx] if landmarks is not None else None,
+                )
+        self._append_rows(n_existing)
         
         # ==========================================
         # STEP 6 & 7: REMOVE DEAD TRACKS
@@ -337,12 +536,16 @@ class DeepSORTLiteTracker:
     
     def _compute_cost_matrix(
         self,
-        detections: List[Tuple[np.ndarray, float, Optional[np.ndarray], Optional[np.ndarray]]],
-        tracks: List[Track]
+        det_bboxes: np.ndarray,
+        det_embs: Optional[np.ndarray],
+        emb_valid: np.ndarray
     ) -> np.ndarray:
         """
         Compute cost matrix with HARD GATING - OPTIMIZED VERSION.
         
+        Detections come as update_batched arrays; track bboxes and embeddings
+        are read straight from the per-track arrays (see _reset_arrays).
+        
         Uses hybrid approach:
         - Vectorized IoU for 3+ detections/tracks (~10x speedup)
         - Scalar IoU for small matrices (lower overhead)
@@ -354,75 +557,90 @@ class DeepSORTLiteTracker:
         - TENTATIVE tracks: IoU cost only (no embeddings)
         - CONFIRMED tracks: Weighted IoU + embedding cost
         """
-        n_det = len(detections)
-        n_trk = len(tracks)
+        n_det = len(det_bboxes)
+        n_trk = len(self._tracks)
         
         if n_det == 0 or n_trk == 0:
-            return np.zeros((n_det, n_trk))
+            return np.zeros((n_det, n_trk), dtype=np.float32)
+        
+        if NUMBA_AVAILABLE and n_det * n_trk < self.NJIT_MAX_PAIRS:
+            return self._compute_cost_matrix_njit(det_bboxes, det_embs, emb_valid)
         
         # ========================================
         # HYBRID IoU COMPUTATION
         # ========================================
         # Use vectorized for larger matrices, scalar for tiny ones
         if n_det * n_trk >= 9:  # 3x3 or larger
-            # Extract bboxes into numpy arrays for vectorized computation
-            det_bboxes = np.array([d[0] for d in detections], dtype=np.float32)
-            trk_bboxes = np.array([t.bbox for t in tracks], dtype=np.float32)
-            iou_matrix = self._compute_iou_matrix_vectorized(det_bboxes, trk_bboxes)
+            # Full IoU matrix in one pass
+            iou_matrix = _box_iou_matrix(det_bboxes, self._bbox_arr)
         else:
             # Scalar for tiny matrices (less numpy overhead)
-            iou_matrix = np.zeros((n_det, n_trk), dtype=np.float64)
-            for d_idx, (det_bbox, _, _, _) in enumerate(detections):
-                for t_idx, track in enumerate(tracks):
-                    iou_matrix[d_idx, t_idx] = self._compute_iou(det_bbox, track.bbox)
+            iou_matrix = np.zeros((n_det, n_trk), dtype=np.float32)
+            for d_idx, det_bbox in enumerate(det_bboxes):
+                for t_idx, trk_bbox in enumerate(self._bbox_arr):
+                    iou_matrix[d_idx, t_idx] = self._compute_iou(det_bbox, trk_bbox)
         
-        # Initialize cost matrix with INVALID
-        cost_matrix = np.full((n_det, n_trk), self.COST_INVALID, dtype=np.float64)
-        
-        # Find valid pairs (IoU above threshold)
+        # HARD GATE 1: IoU threshold. Valid pairs start with IoU-only cost,
+        # which is final for TENTATIVE tracks (no embeddings)
         valid_mask = iou_matrix >= self.iou_threshold
-        
-        # IoU cost for all valid pairs
         iou_cost_matrix = 1.0 - iou_matrix
+        cost_matrix = np.where(valid_mask, iou_cost_matrix, np.float32(self.COST_INVALID))
         
         # ========================================
         # PHASE-BASED COST ASSIGNMENT
         # ========================================
-        for t_idx, track in enumerate(tracks):
-            # Get detection indices that have valid IoU with this track
-            valid_dets = np.where(valid_mask[:, t_idx])[0]
+        # CONFIRMED/RECOGNIZED tracks with an embedding get IoU + embedding
+        # cost against detections that have one; all other pairs keep IoU only
+        trk_idx = np.flatnonzero(self._emb_flag_arr)
+        det_idx = np.flatnonzero(emb_valid)
+        
+        if len(trk_idx) and len(det_idx):
+            # Embeddings are L2-normalized: one GEMM gives every cosine similarity
+            if len(det_idx) < n_det:
+                det_embs = det_embs[det_idx]
+            trk_embs = self._emb_arr if len(trk_idx) == n_trk else self._emb_arr[trk_idx]
+            emb_distance = 1.0 - det_embs @ trk_embs.T
             
-            if len(valid_dets) == 0:
-                continue
-            
-            if track.phase == TrackPhase.TENTATIVE:
-                # TENTATIVE tracks: IoU only (no embeddings)
-                cost_matrix[valid_dets, t_idx] = iou_cost_matrix[valid_dets, t_idx]
+            if len(det_idx) == n_det and len(trk_idx) == n_trk:
+                pairs = (slice(None), slice(None))
             else:
-                # CONFIRMED/RECOGNIZED tracks: IoU + embedding
-                for d_idx in valid_dets:
-                    det_emb = detections[d_idx][2]
-                    
-                    if det_emb is not None and track.embedding is not None:
-                        # Compute embedding distance (cosine)
-                        similarity = np.dot(det_emb, track.embedding)
-                        emb_distance = 1.0 - similarity
-                        
-                        # HARD GATE 2: Embedding distance threshold
-                        if emb_distance > self.max_embedding_distance:
-                            continue  # Keep as INVALID
-                        
-                        # Combined cost (weighted)
-                        cost_matrix[d_idx, t_idx] = (
-                            (1.0 - self.embedding_weight) * iou_cost_matrix[d_idx, t_idx] +
-                            self.embedding_weight * emb_distance
-                        )
-                    else:
-                        # No embedding available, use IoU only
-                        cost_matrix[d_idx, t_idx] = iou_cost_matrix[d_idx, t_idx]
+                pairs = np.ix_(det_idx, trk_idx)
+            combined = (
+                (1.0 - self.embedding_weight) * iou_cost_matrix[pairs] +
+                self.embedding_weight * emb_distance
+            )
+            # HARD GATE 2: Embedding distance threshold (on top of the IoU gate)
+            valid = valid_mask[pairs] & (emb_distance <= self.max_embedding_distance)
+            cost_matrix[pairs] = np.where(valid, combined, self.COST_INVALID)
         
         return cost_matrix
     
+    def _compute_cost_matrix_njit(
+        self,
+        det_bboxes: np.ndarray,
+        det_embs: Optional[np.ndarray],
+        emb_valid: np.ndarray
+    ) -> np.ndarray:
+        """_compute_cost_matrix for a few faces, via _build_cost_njit."""
+        dim = self._emb_arr.shape[1]
+        if det_embs is None or det_embs.shape[1] != dim:
+            # No track embeddings yet (or no detection ones): IoU only
+            det_embs = np.zeros((len(det_bboxes), dim), dtype=np.float32)
+            emb_valid = np.zeros(len(det_bboxes), dtype=bool)
+        
+        return _build_cost_njit(
+            det_bboxes,
+            self._bbox_arr,
+            np.ascontiguousarray(det_embs, dtype=np.float32),
+            self._emb_arr,
+            emb_valid.astype(np.int8),
+            self._emb_flag_arr,
+            self.iou_threshold,
+            self.max_embedding_distance,
+            self.embedding_weight,
+            self.COST_INVALID,
+        )
+    
     def _hungarian_assignment(
         self,
         cost_matrix: np.ndarray
@@ -441,6 +659,14 @@ class DeepSORTLiteTracker:
         if n_det == 0 or n_trk == 0:
             return np.array([]), np.array([])
         
+        if n_det == 1 or n_trk == 1:
+            # A single row/column: the optimal assignment is its cheapest entry
+            flat_idx = int(cost_matrix.argmin())
+            if cost_matrix.flat[flat_idx] >= self.COST_INVALID * 0.5:
+                return np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+            d_idx, t_idx = divmod(flat_idx, n_trk)
+            return np.array([d_idx]), np.array([t_idx])
+        
         if SCIPY_AVAILABLE:
             # Optimal assignment using Hungarian algorithm
             row_indices, col_indices = linear_sum_assignment(cost_matrix)
@@ -462,32 +688,36 @@ class DeepSORTLiteTracker:
         
         Not optimal but works for low FPS scenarios.
         """
-        n_det, n_trk = cost_matrix.shape
+        n_det = cost_matrix.shape[0]
+        
+        # Every row's cheapest track is distinct and valid (well-separated
+        # faces): the row minimums are the optimal assignment
+        row_argmins = cost_matrix.argmin(axis=1)
+        if (
+            len(set(row_argmins.tolist())) == n_det
+            and cost_matrix.min(axis=1).max() < self.COST_INVALID * 0.5
+        ):
+            return np.arange(n_det), row_argmins
+        
         row_indices = []
         col_indices = []
         
-        used_cols = set()
+        # Assigned track columns are set to inf in this copy
+        remaining = cost_matrix.copy()
         
         # Sort by minimum cost per detection
         det_order = np.argsort(cost_matrix.min(axis=1))
         
-        for d_idx in det_order:
-            min_cost = self.COST_INVALID
-            best_t = -1
-            
-            for t_idx in range(n_trk):
-                if t_idx not in used_cols:
-                    cost = cost_matrix[d_idx, t_idx]
-                    if cost < min_cost:
-                        min_cost = cost
-                        best_t = t_idx
+        for d_idx in det_order.tolist():
+            row = remaining[d_idx]
+            best_t = int(row.argmin())
             
-            if best_t >= 0 and min_cost < self.COST_INVALID * 0.5:
+            if row[best_t] < self.COST_INVALID * 0.5:
                 row_indices.append(d_idx)
                 col_indices.append(best_t)
-                used_cols.add(best_t)
+                remaining[:, best_t] = np.inf
         
-        return np.array(row_indices), np.array(col_indices)
+        return np.array(row_indices, dtype=np.intp), np.array(col_indices, dtype=np.intp)
     
     def _update_track_with_detection(
         self,
@@ -505,9 +735,13 @@ class DeepSORTLiteTracker:
         
         IMPORTANT: If a recognized track suddenly has very different appearance,
         we reset it to allow re-recognition (person swap detection).
+        
+        Returns:
+            True if track.embedding was re-averaged and still needs L2
+            normalization (see _normalize_embeddings)
         """
         # Update position and landmarks
-        track.bbox = bbox
+        track.bbox = np.array(bbox, dtype=np.float32)
         track.score = score
         track.hits += 1
         track.time_since_update = 0
@@ -543,26 +777,20 @@ class DeepSORTLiteTracker:
                 track.confidence = 0.0
                 track.recognized_at = None
                 track.phase = TrackPhase.CONFIRMED  # Stay confirmed, just re-recognize
-                track.embedding_history.clear()
-                track.embedding = embedding
-                track.embedding_history.append(embedding)
+                track.clear_embedding_history()
+                track.embedding = embedding.copy()
+                track.add_embedding(embedding)
                 return
         
         # Update embedding (only for CONFIRMED tracks)
         # Why: Tentative tracks have unreliable embeddings
         if track.phase != TrackPhase.TENTATIVE:
             if embedding is not None:
-                track.embedding_history.append(embedding)
-                
-                # Average embeddings for robustness
-                if len(track.embedding_history) > 0:
-                    track.embedding = np.mean(
-                        list(track.embedding_history), axis=0
-                    )
-                    # L2 normalize (required for cosine similarity)
-                    norm = np.linalg.norm(track.embedding)
-                    if norm > 0:
-                        track.embedding = track.embedding / norm
+                # Average embeddings for robustness.
+                # L2 normalization (required for cosine similarity) is done by
+                # the caller for all matched tracks at once
+                track.embedding = track.add_embedding(embedding)
+                return True
         
         # ========================================
         # PHASE TRANSITION: TENTATIVE → CONFIRMED
@@ -574,12 +802,39 @@ class DeepSORTLiteTracker:
                 
                 # Initialize embedding now that track is confirmed
                 if embedding is not None:
-                    track.embedding = embedding
-                    track.embedding_history.append(embedding)
+                    track.embedding = embedding.copy()
+                    track.add_embedding(embedding)
                 
                 logger.debug(
                     f"Track {track.track_id} CONFIRMED after {track.hits} hits"
                 )
+        
+        return False
+    
+    def _normalize_embeddings(self, rows: List[int]):
+        """
+        L2 normalize the embeddings of self._tracks[rows] (array rows and Track objects).
+        
+        Uses one vectorized pass for BATCH_NORMALIZE_MIN+ tracks; below that,
+        per-track norms are cheaper than the gather/scatter.
+        """
+        if len(rows) < self.BATCH_NORMALIZE_MIN:
+            for row in rows:
+                embedding = self._tracks[row].embedding
+                norm = float(np.sqrt(np.vdot(embedding, embedding)))
+                if norm > 0:
+                    embedding *= 1.0 / norm
+                    self._emb_arr[row] = embedding
+            return
+        
+        embeddings = self._emb_arr[rows]
+        norms = np.sqrt(np.einsum('ij,ij->i', embeddings, embeddings))
+        norms[norms == 0] = 1.0
+        embeddings /= norms[:, None]
+        self._emb_arr[rows] = embeddings
+        
+        for row, embedding in zip(rows, embeddings):
+            self._tracks[row].embedding = embedding
     
     def _create_track(
         self,
@@ -596,7 +851,7 @@ class DeepSORTLiteTracker:
         """
         track = Track(
             track_id=self._next_id,
-            bbox=bbox,
+            bbox=np.array(bbox, dtype=np.float32),
             score=score,
             landmarks=landmarks,  # Store landmarks for face alignment
             phase=TrackPhase.TENTATIVE,
@@ -604,6 +859,7 @@ class DeepSORTLiteTracker:
         )
         
         self._tracks.append(track)
+        self._rows[track.track_id] = len(self._tracks) - 1
         self._next_id += 1
         self._stats.tracks_created += 1
         
@@ -623,35 +879,93 @@ class DeepSORTLiteTracker:
         The shorter timeout for recognized tracks prevents "ghost" tracks
         that block new people from being recognized at the same position.
         """
-        before_count = len(self._tracks)
-        
-        surviving_tracks = []
-        for track in self._tracks:
-            # Different timeouts based on track state
-            if track.phase == TrackPhase.TENTATIVE:
-                # Tentative: short timeout (3 frames)
-                max_timeout = 3
-            elif track.recognized:
-                # Recognized: short timeout (5 frames) - allow new person detection
-                max_timeout = 5
-            else:
-                # Confirmed but not recognized: use full max_age
-                max_timeout = self.max_age
-            
-            if track.time_since_update <= max_timeout:
-                surviving_tracks.append(track)
-            else:
+        # Per-phase timeout (indexed by TrackPhase):
+        # TENTATIVE 3 frames, CONFIRMED max_age, RECOGNIZED 5 frames
+        timeouts = np.array([3, self.max_age, 5], dtype=np.int32)
+        keep = self._tsu_arr <= timeouts[self._phase_arr]
+        
+        if not keep.all():
+            for t_idx in np.flatnonzero(~keep):
+                track = self._tracks[t_idx]
                 logger.debug(
                     f"Track {track.track_id} removed "
-                    f"(phase={track.phase.value}, recognized={track.recognized}, "
-                    f"age={track.time_since_update})"
+                    f"(phase={track.phase.name}, recognized={track.recognized}, "
+                    f"age={self._tsu_arr[t_idx]})"
                 )
-        
-        self._tracks = surviving_tracks
-        
-        removed = before_count - len(self._tracks)
-        if removed > 0:
-            logger.debug(f"Removed {removed} dead tracks")
+            
+            self._tracks = [track for track, kept in zip(self._tracks, keep) if kept]
+            self._rows = {track.track_id: row for row, track in enumerate(self._tracks)}
+            self._bbox_arr = self._bbox_arr[keep]
+            self._emb_arr = self._emb_arr[keep]
+            self._emb_flag_arr = self._emb_flag_arr[keep]
+            self._phase_arr = self._phase_arr[keep]
+            self._age_arr = self._age_arr[keep]
+            self._tsu_arr = self._tsu_arr[keep]
+            
+            logger.debug(f"Removed {len(keep) - len(self._tracks)} dead tracks")
+        
+        # Publish the per-frame counters on the Track objects
+        for track, age, time_since_update in zip(
+            self._tracks, self._age_arr.tolist(), self._tsu_arr.tolist()
+        ):
+            track.age = age
+            track.time_since_update = time_since_update
+    
+    def _reset_arrays(self):
+        """
+        Empty the per-track arrays.
+        
+        Row i of each array mirrors self._tracks[i], for the cost matrix and
+        track ageing to work on contiguous data:
+        - _bbox_arr (M, 4) float32, _emb_arr (M, d) float32
+        - _emb_flag_arr (M,) int8: 1 = embedding used in cost (not TENTATIVE, has embedding)
+        - _phase_arr (M,) int8 (TrackPhase values), _age_arr/_tsu_arr (M,) int32
+        _rows maps track_id -> row.
+        """
+        self._rows: Dict[int, int] = {}
+        self._bbox_arr = np.zeros((0, 4), dtype=np.float32)
+        self._emb_arr = np.zeros((0, 0), dtype=np.float32)
+        self._emb_flag_arr = np.zeros(0, dtype=np.int8)
+        self._phase_arr = np.zeros(0, dtype=np.int8)
+        self._age_arr = np.zeros(0, dtype=np.int32)
+        self._tsu_arr = np.zeros(0, dtype=np.int32)
+    
+    def _append_rows(self, start: int):
+        """Add array rows for the tentative tracks self._tracks[start:]."""
+        n_new = len(self._tracks) - start
+        if n_new == 0:
+            return
+        
+        new_bboxes = np.array([t.bbox[:4] for t in self._tracks[start:]], dtype=np.float32)
+        self._bbox_arr = np.concatenate([self._bbox_arr, new_bboxes])
+        self._emb_arr = np.concatenate(
+            [self._emb_arr, np.zeros((n_new, self._emb_arr.shape[1]), dtype=np.float32)]
+        )
+        self._emb_flag_arr = np.concatenate([self._emb_flag_arr, np.zeros(n_new, dtype=np.int8)])
+        self._phase_arr = np.concatenate(
+            [self._phase_arr, np.full(n_new, TrackPhase.TENTATIVE, dtype=np.int8)]
+        )
+        self._age_arr = np.concatenate([self._age_arr, np.zeros(n_new, dtype=np.int32)])
+        self._tsu_arr = np.concatenate([self._tsu_arr, np.zeros(n_new, dtype=np.int32)])
+    
+    def _sync_row(self, t_idx: int):
+        """Copy bbox, embedding and phase of self._tracks[t_idx] into its array row."""
+        track = self._tracks[t_idx]
+        self._bbox_arr[t_idx] = track.bbox[:4]
+        self._phase_arr[t_idx] = track.phase
+        
+        use_embedding = track.phase != TrackPhase.TENTATIVE and track.embedding is not None
+        self._emb_flag_arr[t_idx] = use_embedding
+        if use_embedding:
+            if self._emb_arr.shape[1] != len(track.embedding):
+                # First embedding (or a new embedding size): resize, refill used rows
+                self._emb_arr = np.zeros((len(self._tracks), len(track.embedding)), dtype=np.float32)
+                for row in np.flatnonzero(self._emb_flag_arr):
+                    if len(self._tracks[row].embedding) == self._emb_arr.shape[1]:
+                        self._emb_arr[row] = self._tracks[row].embedding
+                    else:
+                        self._emb_flag_arr[row] = 0
+            self._emb_arr[t_idx] = track.embedding
     
     def _get_confirmed_tracks(self) -> List[Track]:
         """
@@ -661,11 +975,16 @@ class DeepSORTLiteTracker:
         - Displayed in UI
         - Used for gate decisions
         - Passed to recognition
+        
+        Called at the end of update(); also refreshes the cached list that
+        get_all_active_tracks and get_tracks_for_recognition read until the
+        next update (no track enters or leaves this set in between).
         """
-        return [
+        self._confirmed_cache = [
             track for track in self._tracks
-            if track.phase in (TrackPhase.CONFIRMED, TrackPhase.RECOGNIZED)
+            if track.phase >= TrackPhase.CONFIRMED
         ]
+        return list(self._confirmed_cache)
     
     def _compute_iou(self, bbox1: np.ndarray, bbox2: np.ndarray) -> float:
         """Compute Intersection over Union between two bboxes."""
@@ -686,56 +1005,6 @@ class DeepSORTLiteTracker:
         
         return inter_area / union_area
     
-    def _compute_iou_matrix_vectorized(
-        self,
-        det_bboxes: np.ndarray,
-        trk_bboxes: np.ndarray
-    ) -> np.ndarray:
-        """
-        Vectorized IoU computation for all detection-track pairs.
-        
-        This is ~10x faster than calling _compute_iou in a loop.
-        
-        Args:
-            det_bboxes: (N, 4) array of detection bboxes
-            trk_bboxes: (M, 4) array of track bboxes
-        
-        Returns:
-            (N, M) IoU matrix
-        """
-        n_det = det_bboxes.shape[0]
-        n_trk = trk_bboxes.shape[0]
-        
-        if n_det == 0 or n_trk == 0:
-            return np.zeros((n_det, n_trk))
-        
-        # Reshape for broadcasting: det (N,1,4), trk (1,M,4)
-        det = det_bboxes[:, np.newaxis, :]  # (N, 1, 4)
-        trk = trk_bboxes[np.newaxis, :, :]  # (1, M, 4)
-        
-        # Intersection coordinates
-        x1 = np.maximum(det[..., 0], trk[..., 0])
-        y1 = np.maximum(det[..., 1], trk[..., 1])
-        x2 = np.minimum(det[..., 2], trk[..., 2])
-        y2 = np.minimum(det[..., 3], trk[..., 3])
-        
-        # Intersection area
-        inter_w = np.maximum(0, x2 - x1)
-        inter_h = np.maximum(0, y2 - y1)
-        inter_area = inter_w * inter_h
-        
-        # Areas
-        det_area = (det[..., 2] - det[..., 0]) * (det[..., 3] - det[..., 1])
-        trk_area = (trk[..., 2] - trk[..., 0]) * (trk[..., 3] - trk[..., 1])
-        
-        # Union area
-        union_area = det_area + trk_area - inter_area
-        
-        # IoU (avoid division by zero)
-        iou = np.where(union_area > 0, inter_area / union_area, 0.0)
-        
-        return iou
-    
     # ==========================================
     # PUBLIC API FOR RECOGNITION
     # ==========================================
@@ -752,7 +1021,7 @@ class DeepSORTLiteTracker:
         Do NOT run recognition per frame - run it per track returned here.
         """
         return [
-            track for track in self._tracks
+            track for track in self._confirmed_cache
             if track.is_ready_for_recognition()
         ]
     
@@ -792,6 +1061,7 @@ class DeepSORTLiteTracker:
         
         # Mark as recognized (FINAL)
         track.mark_recognized(face_id, user_id, name, status, confidence)
+        self._sync_row(self._rows[track_id])
         
         # Update statistics
         self._stats.tracks_recognized += 1
@@ -813,10 +1083,8 @@ class DeepSORTLiteTracker:
     
     def get_track(self, track_id: int) -> Optional[Track]:
         """Get track by ID."""
-        for track in self._tracks:
-            if track.track_id == track_id:
-                return track
-        return None
+        row = self._rows.get(track_id)
+        return None if row is None else self._tracks[row]
     
     def get_all_tracks(self) -> List[Track]:
         """Get all tracks (including tentative)."""
@@ -829,10 +1097,7 @@ class DeepSORTLiteTracker:
         Used for skip-detection optimization:
         - If all active tracks are recognized and stable, skip detection
         """
-        return [
-            track for track in self._tracks
-            if track.phase in (TrackPhase.CONFIRMED, TrackPhase.RECOGNIZED)
-        ]
+        return list(self._confirmed_cache)
     
     def get_statistics(self) -> TrackerStatistics:
         """Get tracker statistics."""
@@ -842,6 +1107,8 @@ class DeepSORTLiteTracker:
     def clear(self):
         """Clear all tracks and reset statistics."""
         self._tracks.clear()
+        self._reset_arrays()
+        self._confirmed_cache = []
         self._next_id = 1
         self._stats = TrackerStatistics()
 